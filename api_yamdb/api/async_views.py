@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+_executor = None
+
+
+def get_read_executor():
+    """Пул потоков для чтения.
+
+    Число потоков (и соединений с БД) ограничено ASYNC_READ_THREADS
+    независимо от числа одновременных клиентов.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_READ_THREADS,
+            thread_name_prefix='api-read'
+        )
+    return _executor
+
+
+def run_read(view, request, *args, **kwargs):
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Обернуть синхронное представление DRF в асинхронное.
+
+    Чтение (GET, HEAD, OPTIONS) выполняется в пуле потоков, не занимая
+    цикл событий ASGI; запись идёт через общий thread-sensitive поток,
+    как у обычных синхронных представлений под ASGI.
+    """
+    write = sync_to_async(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            read = sync_to_async(
+                run_read, thread_sensitive=False,
+                executor=get_read_executor()
+            )
+            return await read(view, request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncReadMixin:
+    """Отдавать чтение через async_read_view, если включён ASYNC_READS."""
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_READS:
+            return view
+        return async_read_view(view)
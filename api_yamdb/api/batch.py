@@ -0,0 +1,88 @@
+"""Пакетные запросы: несколько вызовов API за один HTTP-запрос.
+
+Каждый подзапрос проходит через обычный URL-роутер и представление DRF,
+но без повторной аутентификации: пользователь внешнего запроса
+передаётся подзапросам как уже проверенный. Подзапросы выполняются по
+порядку в текущем потоке и на его соединении с БД; если все они только
+читают и запрошен parallel, они идут в пуле потоков чтения. Ошибка
+одного подзапроса пишется в лог и становится его ответом со статусом
+500, не обрывая остальные.
+
+Пакет не атомарен: каждый подзапрос записи фиксируется отдельно, и
+ошибка следующего не откатывает уже выполненные.
+"""
+import asyncio
+import json
+import logging
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS
+
+from .async_views import get_read_executor, run_read
+
+logger = logging.getLogger(__name__)
+
+
+def build_request(request, item):
+    url = urlsplit(item['url'])
+    body = b''
+    if 'body' in item:
+        body = json.dumps(item['body']).encode()
+    environ = {
+        **request.META,
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    }
+    environ.pop('HTTP_CONTENT_ENCODING', None)
+    sub_request = WSGIRequest(environ)
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def resolve_view(path):
+    match = resolve(path)
+    view = match.func
+    # Асинхронная обёртка чтения не нужна: подзапрос уже в своём потоке.
+    if asyncio.iscoroutinefunction(view):
+        view = view.__wrapped__
+    return view, match.args, match.kwargs
+
+
+def dispatch(request, item):
+    """Выполнить подзапрос item и вернуть его статус и данные."""
+    sub_request = build_request(request, item)
+    try:
+        view, args, kwargs = resolve_view(sub_request.path_info)
+    except Resolver404:
+        return {'status': 404, 'body': {'detail': 'Страница не найдена.'}}
+    try:
+        response = view(sub_request, *args, **kwargs)
+    except Exception:
+        logger.exception(
+            'Ошибка подзапроса %s %s', item['method'], item['url']
+        )
+        return {'status': 500, 'body': {'detail': 'Ошибка сервера.'}}
+    return {
+        'status': response.status_code,
+        'body': getattr(response, 'data', None),
+    }
+
+
+def dispatch_read(request, item):
+    return run_read(dispatch, request, item)
+
+
+def execute(request, items, parallel=False):
+    if parallel and all(item['method'] in SAFE_METHODS for item in items):
+        return list(get_read_executor().map(
+            lambda item: dispatch_read(request, item), items
+        ))
+    return [dispatch(request, item) for item in items]
@@ -0,0 +1,459 @@
+"""Индекс каталога произведений в памяти процесса.
+
+Для каждого произведения хранятся id, год, категория, маска жанров,
+рейтинг и число отзывов в массивах NumPy. Фильтры TitleFilter,
+сортировка и постраничная выдача считаются векторно, а из БД читается
+только одна страница по списку id.
+
+Тот же индекс подсказывает названия при наборе: отсортированный список
+нормализованных названий ищется бинарным поиском по префиксу, а
+триграммный индекс из api.fuzzy находит названия с опечатками.
+
+Изменения из сигналов моделей применяются к индексу построчно, а
+записи других процессов индекс догоняет по журналу изменений
+(reviews.changes): не чаще раза в CATALOG_INDEX_SYNC_INTERVAL секунд он
+перечитывает строки произведений с записями после своего курсора.
+Целиком индекс перестраивается, только если таких произведений больше
+CATALOG_INDEX_SYNC_LIMIT или журнал после курсора удалён по сроку.
+
+Индекс строится в фоновом потоке и подменяет прежний целиком, а запросы
+не ждут построения: пока индекс не готов, списки и подсказки отвечают
+через ORM.
+
+Без CATALOG_INDEX_ENABLED индексом пользуется только нечёткий поиск, и
+сигналы моделей его не трогают: он догоняет журнал перед поиском.
+"""
+import bisect
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+
+from reviews import changes
+from reviews.models import Title, normalize_name
+from .fuzzy import TrigramIndex
+
+ORDERING_FIELDS = ('name', 'year', 'rating', 'reviews_count')
+
+# Параметры запроса, которые индекс умеет обрабатывать сам.
+SUPPORTED_PARAMS = {
+    'genre', 'genre_mode', 'category', 'name', 'year', 'year_min',
+    'year_max', 'rating_min', 'rating_max', 'name_prefix', 'name_contains',
+    'ordering', 'page', 'page_size', 'count', 'format', 'facets',
+    'include', 'reviews_limit',
+}
+
+ROW_FIELDS = (
+    'id', 'name', 'name_normalized', 'year', 'category_id', 'genre_mask',
+    'rating', 'reviews_count'
+)
+
+
+class CatalogIndex:
+
+    # Атрибуты самого объекта, а не данных индекса: при подмене данных
+    # построенным заново индексом они не переносятся.
+    OWN_ATTRS = ('lock', 'build_lock', 'sync_lock', 'builder')
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.builder = None
+        self.built = False
+        self.cursor = None
+
+    def build(self):
+        """Построить индекс заново и подменить им текущий.
+
+        Строки читаются без блокировки: до подмены запросы отвечают из
+        прежнего индекса или через ORM. Курсор журнала берётся до чтения
+        строк, поэтому запись во время построения будет применена ещё
+        раз при следующей сверке с журналом.
+        """
+        cursor = changes.latest_cursor()
+        fresh = CatalogIndex()
+        fresh.load(list(Title.objects.values_list(*ROW_FIELDS)))
+        with self.lock:
+            for attr, value in vars(fresh).items():
+                if attr not in self.OWN_ATTRS:
+                    setattr(self, attr, value)
+            self.cursor = cursor
+            self.synced_at = time.monotonic()
+            self.built = True
+
+    def run_build(self):
+        try:
+            self.build()
+        finally:
+            connections.close_all()
+
+    def start_build(self):
+        """Запустить построение в фоне, если оно ещё не идёт."""
+        with self.build_lock:
+            if self.builder is None or not self.builder.is_alive():
+                self.builder = threading.Thread(
+                    target=self.run_build, name='catalog-index', daemon=True
+                )
+                self.builder.start()
+            return self.builder
+
+    def sync(self):
+        """Догнать журнал изменений; False, если нужна перестройка.
+
+        Пока журнал сверяет другой поток, индекс отвечает как есть.
+        """
+        if time.monotonic() - self.synced_at < (
+                settings.CATALOG_INDEX_SYNC_INTERVAL):
+            return True
+        if not self.sync_lock.acquire(blocking=False):
+            return True
+        try:
+            cursor = self.cursor
+            if changes.is_truncated(cursor):
+                return False
+            horizon = changes.latest_cursor()
+            limit = settings.CATALOG_INDEX_SYNC_LIMIT
+            title_ids = list(
+                changes.changed_ids(Title, cursor, horizon)[:limit + 1]
+            )
+            if len(title_ids) > limit:
+                return False
+            self.refresh(title_ids)
+            with self.lock:
+                # Перестройка могла подменить индекс с более новым курсором.
+                if self.cursor == cursor:
+                    self.cursor = horizon
+                self.synced_at = time.monotonic()
+            return True
+        finally:
+            self.sync_lock.release()
+
+    def ready(self):
+        """Готов ли индекс; отставший от журнала перестраивается в фоне."""
+        if self.built and self.sync():
+            return True
+        self.start_build()
+        return False
+
+    def load(self, rows):
+        size = max(len(rows), 16)
+        self.ids = np.zeros(size, dtype=np.int64)
+        self.years = np.zeros(size, dtype=np.int64)
+        self.categories = np.zeros(size, dtype=np.int64)
+        self.masks = np.zeros(size, dtype=np.int64)
+        self.ratings = np.full(size, np.nan)
+        self.reviews_counts = np.zeros(size, dtype=np.int64)
+        self.alive = np.zeros(size, dtype=bool)
+        self.names = [''] * size
+        self.normalized = [''] * size
+        self.positions = {}
+        self.length = 0
+        self.prefix = None
+        self.trigrams = None
+        for row in rows:
+            self.put(row)
+        self.prefix = sorted(
+            (self.normalized[position], position)
+            for position in range(self.length)
+        )
+        self.name_rank = None
+        self.trigrams = self.load_trigrams()
+
+    def grow(self):
+        size = len(self.ids) * 2
+        for attr in ('ids', 'years', 'categories', 'masks', 'ratings',
+                     'reviews_counts', 'alive'):
+            old = getattr(self, attr)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+        self.ratings[self.length:] = np.nan
+        self.names.extend([''] * (size - len(self.names)))
+        self.normalized.extend([''] * (size - len(self.normalized)))
+
+    def put(self, row):
+        (title_id, name, normalized, year, category_id, mask, rating,
+         reviews_count) = row
+        position = self.positions.get(title_id)
+        if position is None:
+            if self.length == len(self.ids):
+                self.grow()
+            position = self.length
+            self.length += 1
+            self.positions[title_id] = position
+        else:
+            self.unindex_name(position)
+        self.ids[position] = title_id
+        self.years[position] = year
+        self.categories[position] = category_id or 0
+        self.masks[position] = mask
+        self.ratings[position] = np.nan if rating is None else rating
+        self.reviews_counts[position] = reviews_count
+        self.alive[position] = True
+        self.names[position] = name
+        self.normalized[position] = normalized or normalize_name(name)
+        if self.prefix is not None:
+            bisect.insort(self.prefix, (self.normalized[position], position))
+        if self.trigrams is not None:
+            self.trigrams.update(position, self.normalized[position])
+        self.name_rank = None
+
+    def unindex_name(self, position):
+        if self.prefix is not None:
+            del self.prefix[bisect.bisect_left(
+                self.prefix, (self.normalized[position], position)
+            )]
+
+    def refresh(self, title_ids):
+        """Перечитать строки произведений после записи."""
+        if not title_ids:
+            return
+        rows = list(
+            Title.objects.filter(pk__in=title_ids).values_list(*ROW_FIELDS)
+        )
+        with self.lock:
+            if not self.built:
+                return
+            found = set()
+            for row in rows:
+                self.put(row)
+                found.add(row[0])
+            for title_id in set(title_ids) - found:
+                self.remove(title_id)
+            if self.trigrams.needs_compaction():
+                self.start_build()
+
+    def remove(self, title_id):
+        position = self.positions.pop(title_id, None)
+        if position is not None:
+            self.alive[position] = False
+            self.unindex_name(position)
+            self.trigrams.update(position, None)
+
+    def invalidate(self):
+        with self.lock:
+            self.built = False
+
+    def get_name_rank(self):
+        if self.name_rank is None:
+            order = sorted(range(self.length), key=self.names.__getitem__)
+            self.name_rank = np.empty(self.length, dtype=np.int64)
+            self.name_rank[order] = np.arange(self.length)
+        return self.name_rank
+
+    def sort_key(self, field):
+        n = self.length
+        if field == 'name':
+            return self.get_name_rank()
+        if field == 'rating':
+            # NULL меньше любого рейтинга, как в SQLite.
+            return np.nan_to_num(self.ratings[:n], nan=-math.inf)
+        if field == 'year':
+            return self.years[:n]
+        return self.reviews_counts[:n]
+
+    def search(self, data):
+        """id произведений по очищенным данным TitleFilter и сортировке.
+
+        None, если индекс ещё не готов.
+        """
+        if not self.ready():
+            return None
+        with self.lock:
+            n = self.length
+            selected = self.alive[:n].copy()
+            selected &= self.filter_genre(data)
+            categories = data.get('category')
+            if categories:
+                selected &= np.isin(
+                    self.categories[:n],
+                    [category.id for category in categories]
+                )
+            for key, values, compare in (
+                ('year', self.years, np.equal),
+                ('year_min', self.years, np.greater_equal),
+                ('year_max', self.years, np.less_equal),
+                ('rating_min', self.ratings, np.greater_equal),
+                ('rating_max', self.ratings, np.less_equal),
+            ):
+                if data.get(key) is not None:
+                    selected &= compare(values[:n], float(data[key]))
+            positions = np.flatnonzero(selected)
+            positions = self.filter_names(positions, data)
+            # Последний ключ сортировки — id, как у StableOrderingFilter.
+            keys = [self.ids[positions]]
+            for field in reversed(data['ordering']):
+                key = self.sort_key(field.lstrip('-'))[positions]
+                keys.append(-key if field.startswith('-') else key)
+            positions = positions[np.lexsort(keys)]
+            return self.ids[positions].tolist()
+
+    def autocomplete(self, query, limit):
+        """Первые limit произведений по рейтингу среди названий с префиксом.
+
+        None, если индекс ещё не готов.
+        """
+        if not self.ready():
+            return None
+        prefix = normalize_name(query)
+        with self.lock:
+            start = bisect.bisect_left(self.prefix, (prefix,))
+            end = bisect.bisect_left(self.prefix, (prefix + chr(0x10FFFF),))
+            positions = np.fromiter(
+                (position for _, position in self.prefix[start:end]),
+                dtype=np.int64, count=end - start
+            )
+            ratings = np.nan_to_num(self.ratings[positions], nan=-math.inf)
+            # Срез уже отсортирован по названию: порядок в нём — второй ключ.
+            order = np.arange(len(positions))
+            if len(positions) > limit:
+                order = np.argpartition(-ratings, limit - 1)[:limit]
+            order = order[np.lexsort((order, -ratings[order]))]
+            positions = positions[order]
+            return [{
+                'id': int(self.ids[position]),
+                'name': self.names[position],
+                'year': int(self.years[position]),
+                'rating': (None if math.isnan(self.ratings[position])
+                           else float(self.ratings[position])),
+            } for position in positions]
+
+    def wait_built(self):
+        """Дождаться только первого построения индекса.
+
+        Построенный индекс отвечает и тогда, когда отстал от журнала:
+        новый тем временем строится в фоне.
+        """
+        if self.built:
+            self.ready()
+            return
+        self.start_build().join()
+        if not self.built:
+            # Фоновое построение не удалось: ошибка всплывёт здесь.
+            self.build()
+
+    def alive_names(self):
+        return [name if alive else None for name, alive in zip(
+            self.normalized[:self.length], self.alive[:self.length]
+        )]
+
+    def load_trigrams(self):
+        """Триграммный индекс: из снимка FUZZY_INDEX_PATH или заново."""
+        path = settings.FUZZY_INDEX_PATH
+        names = self.alive_names()
+        if path and os.path.exists(path):
+            trigrams = TrigramIndex.load(
+                path, self.ids[:self.length].tolist(), names
+            )
+            if not trigrams.needs_compaction():
+                return trigrams
+        trigrams = TrigramIndex()
+        trigrams.build(names)
+        return trigrams
+
+    def fuzzy(self, query, limit):
+        """id произведений с похожими названиями, от самых похожих.
+
+        Без ORM-замены нечёткий поиск ждёт только первого построения.
+        """
+        self.wait_built()
+        with self.lock:
+            positions, _ = self.trigrams.search(
+                normalize_name(query), limit,
+                settings.FUZZY_SEARCH_THRESHOLD
+            )
+            return self.ids[positions].tolist()
+
+    def save_trigrams(self, path):
+        """Перестроить триграммный индекс и сохранить снимок в path."""
+        if not (self.built and self.sync()):
+            self.build()
+        with self.lock:
+            names = self.alive_names()
+            self.trigrams = TrigramIndex()
+            self.trigrams.build(names)
+            self.trigrams.save(path, self.ids[:self.length].tolist(), names)
+
+    def filter_genre(self, data):
+        genres = data.get('genre')
+        n = self.length
+        if not genres:
+            return np.ones(n, dtype=bool)
+        masks = self.masks[:n]
+        mask = 0
+        for genre in genres:
+            mask |= 1 << genre.bit
+        if data.get('genre_mode') == 'all':
+            return (masks & mask) == mask
+        return (masks & mask) != 0
+
+    def filter_names(self, positions, data):
+        name = data.get('name')
+        prefix = data.get('name_prefix')
+        contains = data.get('name_contains')
+        if not (name or prefix or contains):
+            return positions
+        prefix = normalize_name(prefix) if prefix else ''
+        contains = normalize_name(contains) if contains else ''
+        return np.array([
+            position for position in positions
+            if (not name or self.names[position] == name)
+            and self.normalized[position].startswith(prefix)
+            and contains in self.normalized[position]
+        ], dtype=np.int64)
+
+
+catalog = CatalogIndex()
+
+
+def parse_ordering(value):
+    """Поля сортировки из ?ordering= или None, если их не поддержать."""
+    if not value:
+        return ['name']
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    if not all(field.lstrip('-') in ORDERING_FIELDS for field in fields):
+        return None
+    return fields
+
+
+def search(query_params, filterset):
+    """Ответить на запрос списка из индекса.
+
+    Возвращает None, если в запросе есть параметры, которые индекс не
+    обрабатывает, или жанры без бита маски: тогда работает ORM.
+    """
+    if not set(query_params) <= SUPPORTED_PARAMS:
+        return None
+    if not filterset.is_valid():
+        return None
+    ordering = parse_ordering(query_params.get('ordering'))
+    if ordering is None:
+        return None
+    data = dict(filterset.form.cleaned_data, ordering=ordering)
+    genres = data.get('genre')
+    if genres and any(genre.bit is None for genre in genres):
+        return None
+    return catalog.search(data)
+
+
+def autocomplete(query, limit):
+    titles = None
+    if settings.CATALOG_INDEX_ENABLED:
+        titles = catalog.autocomplete(query, limit)
+    if titles is None:
+        titles = Title.objects.filter(
+            name_normalized__startswith=normalize_name(query)
+        ).order_by(
+            F('rating').desc(nulls_last=True), 'name_normalized', 'id'
+        ).values('id', 'name', 'year', 'rating')[:limit]
+    return titles
+
+
+def fuzzy(query, limit):
+    return catalog.fuzzy(query, limit)
@@ -0,0 +1,197 @@
+"""Поток новых отзывов и комментариев произведения (Server-Sent Events).
+
+GET /api/v1/titles/{id}/events/ под ASGI держит соединение открытым и
+отправляет событие на каждый новый отзыв или комментарий произведения.
+Сигнал после коммита публикует событие один раз, сериализуя его тоже
+один раз; Broadcaster раздаёт готовые байты очередям всех подписчиков
+канала в процессе, без запросов к БД.
+
+Между процессами события передаёт бэкенд из EVENTS_BACKEND: publish
+отправляет сообщение, а получатель вызывает deliver в каждом процессе.
+LocalBackend доставляет сразу и только в свой процесс: подписчики других
+воркеров его событий не получат, поэтому он подходит лишь для одного
+процесса и тестов. Сигналы не сериализуют событие, если бэкенд через
+has_subscribers сообщает, что канал никто не слушает; бэкенд без этого
+метода считается всегда имеющим подписчиков.
+"""
+import asyncio
+import re
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from reviews.models import Title
+from .renderers import FastJSONRenderer
+
+STREAM_PATH = re.compile(r'^/api/v1/titles/(?P<title_id>\d+)/events/$')
+STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def title_channel(title_id):
+    return f'title:{title_id}'
+
+
+class Subscription:
+    """Очередь событий одного клиента в его цикле событий."""
+
+    def __init__(self, broadcaster, channel):
+        self.broadcaster = broadcaster
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+
+    def push(self, message):
+        self.loop.call_soon_threadsafe(self.put, message)
+
+    def put(self, message):
+        # Медленный клиент теряет самые старые события, а не память.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """Раздача сообщений подписчикам каналов внутри процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self.lock:
+            self.channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[subscription.channel]
+
+    def has_subscribers(self, channel):
+        with self.lock:
+            return channel in self.channels
+
+    def deliver(self, channel, message):
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.push(message)
+
+
+class LocalBackend:
+    """Доставка только в текущий процесс, без связи между воркерами."""
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def has_subscribers(self, channel):
+        return broadcaster.has_subscribers(channel)
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+
+broadcaster = Broadcaster()
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.EVENTS_BACKEND)(
+            broadcaster.deliver
+        )
+    return _backend
+
+
+def encode(event, data):
+    return b'event: %s\ndata: %s\n\n' % (
+        event.encode(), FastJSONRenderer().render(data)
+    )
+
+
+def has_subscribers(title_id):
+    check = getattr(get_backend(), 'has_subscribers', None)
+    return check is None or check(title_channel(title_id))
+
+
+def publish(title_id, event, data):
+    get_backend().publish(title_channel(title_id), encode(event, data))
+
+
+def title_exists(title_id):
+    try:
+        return Title.objects.filter(pk=title_id).exists()
+    finally:
+        close_old_connections()
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_stream(send, receive, title_id):
+    if not await sync_to_async(title_exists, thread_sensitive=False)(
+            title_id):
+        await send({'type': 'http.response.start', 'status': 404,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Not Found'})
+        return
+    subscription = broadcaster.subscribe(title_channel(title_id))
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    message = asyncio.ensure_future(subscription.get())
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': STREAM_HEADERS})
+        await send({'type': 'http.response.body',
+                    'body': b': connected\n\n', 'more_body': True})
+        while True:
+            done, _ = await asyncio.wait(
+                {disconnect, message}, timeout=settings.EVENTS_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect in done:
+                break
+            body = b': keepalive\n\n'
+            if message in done:
+                body = message.result()
+                message = asyncio.ensure_future(subscription.get())
+            await send({'type': 'http.response.body', 'body': body,
+                        'more_body': True})
+    finally:
+        subscription.close()
+        disconnect.cancel()
+        message.cancel()
+
+
+def with_event_streams(application):
+    """ASGI-приложение: потоки событий, остальное — в application."""
+
+    async def router(scope, receive, send):
+        match = None
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            match = STREAM_PATH.match(scope['path'])
+        if match is None:
+            return await application(scope, receive, send)
+        await send_stream(send, receive, int(match['title_id']))
+
+    return router
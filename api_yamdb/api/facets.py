@@ -0,0 +1,83 @@
+"""Счётчики фасетов для списка произведений (?facets=genre,category,year).
+
+Каждый фасет считается одним сгруппированным запросом к отфильтрованным
+произведениям. Жанры группируются по genre_mask: различных масок мало,
+а число произведений каждого жанра получается сложением битов масок в
+NumPy, без соединения с reviews_title_genre.
+"""
+import numpy as np
+from django.db.models import Count, F
+from rest_framework.exceptions import ValidationError
+
+from reviews.constants import GENRE_MASK_BITS
+from reviews.models import Genre, Title
+
+
+def genre_counts(titles):
+    masks, counts = np.array(
+        list(titles.values_list('genre_mask').annotate(
+            count=Count('id')
+        ).order_by()), dtype=np.int64
+    ).reshape(-1, 2).T
+    bits = (masks[:, None] >> np.arange(GENRE_MASK_BITS)) & 1
+    per_bit = (counts @ bits).tolist()
+    result = [
+        {'slug': slug, 'name': name, 'count': per_bit[bit]}
+        for slug, name, bit in Genre.objects.exclude(bit=None).values_list(
+            'slug', 'name', 'bit'
+        )
+    ]
+    # Жанры сверх GENRE_MASK_BITS бита не имеют и считаются соединением.
+    result.extend(
+        {'slug': row['genre__slug'], 'name': row['genre__name'],
+         'count': row['count']}
+        for row in Title.genre.through.objects.filter(
+            title__in=titles, genre__bit=None
+        ).values('genre__slug', 'genre__name').annotate(
+            count=Count('title_id')
+        ).order_by()
+    )
+    return sorted(
+        (row for row in result if row['count']),
+        key=lambda row: (-row['count'], row['slug'])
+    )
+
+
+def category_counts(titles):
+    return [
+        {'slug': row['category__slug'], 'name': row['category__name'],
+         'count': row['count']}
+        for row in titles.exclude(category=None).values(
+            'category__slug', 'category__name'
+        ).annotate(count=Count('id')).order_by('-count', 'category__slug')
+    ]
+
+
+def year_counts(titles):
+    """Число произведений по десятилетиям."""
+    return list(titles.annotate(
+        decade=F('year') / 10 * 10
+    ).values('decade').annotate(count=Count('id')).order_by('decade'))
+
+
+FACETS = {
+    'genre': genre_counts,
+    'category': category_counts,
+    'year': year_counts,
+}
+
+
+def parse(value):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in FACETS]
+    if unknown or not names:
+        raise ValidationError({'facets': (
+            f'Доступные фасеты: {", ".join(FACETS)}.'
+        )})
+    return names
+
+
+def counts(queryset, names):
+    """Фасеты names для произведений queryset."""
+    titles = Title.objects.filter(pk__in=queryset.values('pk'))
+    return {name: FACETS[name](titles) for name in names}
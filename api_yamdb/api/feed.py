@@ -0,0 +1,92 @@
+"""Лента последних отзывов и комментариев всего сайта.
+
+Отзывы и комментарии читаются двумя запросами по индексу pub_date от
+новых к старым, каждый не больше чем на страницу, и сливаются кучей
+(heapq.merge). Страницы листаются курсором — ключом последней выданной
+записи, поэтому глубина пролистывания не влияет на стоимость запроса.
+"""
+import heapq
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+
+from reviews.constants import MAX_ID
+from reviews.models import Comment, Review
+
+# Порядок видов при равном pub_date: отзыв раньше комментария.
+KINDS = {'comment': 0, 'review': 1}
+
+
+def reviews():
+    return Review.objects.values(
+        'id', 'text', 'pub_date', 'title_id', 'score',
+        author_username=F('author__username')
+    )
+
+
+def comments():
+    return Comment.objects.values(
+        'id', 'text', 'pub_date', 'review_id',
+        title_id=F('review__title_id'), author_username=F('author__username')
+    )
+
+
+STREAMS = {'review': reviews, 'comment': comments}
+
+
+def sort_key(entry):
+    return entry['pub_date'], KINDS[entry['type']], entry['id']
+
+
+def encode_cursor(entry):
+    return urlsafe_b64encode('|'.join((
+        entry['pub_date'].isoformat(), entry['type'], str(entry['id'])
+    )).encode()).decode()
+
+
+def decode_cursor(value):
+    try:
+        pub_date, kind, pk = urlsafe_b64decode(
+            value.encode()
+        ).decode().split('|')
+        cursor = datetime.fromisoformat(pub_date), KINDS[kind], int(pk)
+        if abs(cursor[2]) > MAX_ID:
+            raise ValueError(pk)
+    except (ValueError, KeyError):
+        raise ValidationError({'cursor': 'Некорректный курсор.'})
+    return cursor
+
+
+def after(kind, cursor):
+    """Условие «старше курсора» для записей вида kind."""
+    pub_date, rank, pk = cursor
+    if KINDS[kind] > rank:
+        return Q(pub_date__lt=pub_date)
+    if KINDS[kind] < rank:
+        return Q(pub_date__lte=pub_date)
+    return Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+
+
+def stream(kind, cursor, size):
+    rows = STREAMS[kind]()
+    if cursor is not None:
+        rows = rows.filter(after(kind, cursor))
+    for row in rows.order_by('-pub_date', '-id')[:size]:
+        row['type'] = kind
+        yield row
+
+
+def page(cursor, size):
+    """Записи страницы от новых к старым и курсор следующей (или None)."""
+    if cursor is not None:
+        cursor = decode_cursor(cursor)
+    entries = list(islice(heapq.merge(
+        *(stream(kind, cursor, size + 1) for kind in STREAMS),
+        key=sort_key, reverse=True
+    ), size + 1))
+    if len(entries) <= size:
+        return entries, None
+    return entries[:size], encode_cursor(entries[size - 1])
@@ -1,20 +1,72 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 
-from reviews.models import Title, Category, Genre
+from reviews import genre_masks
+from reviews.models import Title, Category, Genre, normalize_name
+
+
+class StableOrderingFilter(OrderingFilter):
+    """Сортировка с id последним ключом: равные не скачут по страницам."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or ())
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering.append('id')
+        return ordering
 
 
 class TitleFilter(filters.FilterSet):
     genre = filters.ModelMultipleChoiceFilter(
         field_name='genre__slug',
         to_field_name='slug',
-        queryset=Genre.objects.all()
+        queryset=Genre.objects.all(),
+        method='filter_genre'
+    )
+    genre_mode = filters.ChoiceFilter(
+        choices=(('any', 'any'), ('all', 'all')),
+        method='filter_genre_mode'
     )
     category = filters.ModelMultipleChoiceFilter(
         field_name='category__slug',
         to_field_name='slug',
         queryset=Category.objects.all()
     )
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    rating_min = filters.NumberFilter(field_name='rating', lookup_expr='gte')
+    rating_max = filters.NumberFilter(field_name='rating', lookup_expr='lte')
+    name_prefix = filters.CharFilter(method='filter_name_prefix')
+    name_contains = filters.CharFilter(method='filter_name_contains')
 
     class Meta:
         model = Title
         fields = ('genre', 'category', 'name', 'year')
+
+    def filter_genre(self, queryset, name, genres):
+        """Жанры через битовую маску: any — хотя бы один, all — все сразу.
+
+        Жанры без бита (сверх GENRE_MASK_BITS) фильтруются соединением.
+        """
+        if not genres:
+            return queryset
+        mask, unmasked = genre_masks.genres_mask(genres)
+        if self.form.cleaned_data.get('genre_mode') == 'all':
+            for genre in unmasked:
+                queryset = queryset.filter(genre=genre)
+            return genre_masks.with_bits(queryset, mask)
+        if unmasked:
+            return queryset.filter(genre__in=genres).distinct()
+        return genre_masks.with_any_bit(queryset, mask)
+
+    def filter_genre_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_name_prefix(self, queryset, name, value):
+        # LIKE 'префикс%' по name_normalized: в PostgreSQL для него есть
+        # индекс varchar_pattern_ops, не зависящий от сортировки БД.
+        return queryset.filter(
+            name_normalized__startswith=normalize_name(value)
+        )
+
+    def filter_name_contains(self, queryset, name, value):
+        return queryset.filter(name_normalized__contains=normalize_name(value))
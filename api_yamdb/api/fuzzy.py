@@ -0,0 +1,194 @@
+"""Нечёткий поиск по названиям через триграммы.
+
+Название приводится к латинице транслитерацией, поэтому «terminator»
+находит «Терминатор». Каждое слово дополняется пробелами и режется на
+триграммы, как в pg_trgm, а похожесть — доля общих триграмм запроса и
+названия (коэффициент Жаккара).
+
+Инвертированный индекс хранится в массивах NumPy: postings — позиции
+произведений, сгруппированные по номеру триграммы, starts — границы
+групп. Изменённые после построения позиции живут в dirty и
+досчитываются отдельно, пока их не станет слишком много.
+"""
+import os
+import re
+
+import numpy as np
+
+TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n',
+    'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f',
+    'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '',
+    'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+})
+
+WORD_RE = re.compile(r'\w+')
+
+# Доля изменённых позиций, после которой индекс строится заново.
+COMPACTION_RATIO = 0.01
+
+COMPACTION_MIN = 1000
+
+
+def transliterate(value):
+    return value.translate(TRANSLIT)
+
+
+def trigrams(value):
+    """Множество триграмм нормализованного названия или запроса."""
+    grams = set()
+    for word in WORD_RE.findall(transliterate(value)):
+        word = f'  {word} '
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class TrigramIndex:
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.postings = np.zeros(0, dtype=np.int64)
+        self.starts = np.zeros(1, dtype=np.int64)
+        self.sizes = np.zeros(0, dtype=np.int64)
+        self.dirty = {}
+
+    def encode_list(self, grams, add=True):
+        codes = []
+        for gram in grams:
+            code = self.vocabulary.get(gram)
+            if code is None and add:
+                code = self.vocabulary[gram] = len(self.vocabulary)
+            if code is not None:
+                codes.append(code)
+        return codes
+
+    def encode(self, grams, add=True):
+        return np.array(sorted(self.encode_list(grams, add)), dtype=np.int64)
+
+    def build(self, names):
+        """Построить индекс по названиям позиций (None — позиции нет)."""
+        codes, sizes = [], []
+        for name in names:
+            title_codes = (
+                [] if name is None else self.encode_list(trigrams(name))
+            )
+            codes.extend(title_codes)
+            sizes.append(len(title_codes))
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.set_postings(
+            np.array(codes, dtype=np.int64),
+            np.repeat(np.arange(len(names)), self.sizes)
+        )
+        self.dirty = {}
+
+    def set_postings(self, codes, owners):
+        order = np.argsort(codes, kind='stable')
+        self.postings = owners[order]
+        self.starts = np.searchsorted(
+            codes[order], np.arange(len(self.vocabulary) + 1)
+        )
+
+    def update(self, position, name):
+        self.dirty[position] = (
+            None if name is None else self.encode(trigrams(name))
+        )
+
+    def needs_compaction(self):
+        return len(self.dirty) > max(
+            COMPACTION_MIN, COMPACTION_RATIO * len(self.sizes)
+        )
+
+    def search(self, query, limit, threshold):
+        """Позиции и похожесть лучших limit названий не ниже threshold."""
+        grams = trigrams(query)
+        codes = self.encode(grams, add=False)
+        total = len(grams)
+        if not total:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        indexed = codes[codes < len(self.starts) - 1]
+        counts = np.zeros(len(self.sizes), dtype=np.int64)
+        for code in indexed:
+            # Позиции внутри одной триграммы не повторяются.
+            counts[self.postings[self.starts[code]:self.starts[code + 1]]] += 1
+        candidates = np.flatnonzero(counts)
+        shared = counts[candidates]
+        sizes = self.sizes[candidates]
+        if self.dirty:
+            stale = np.isin(candidates, list(self.dirty))
+            candidates = candidates[~stale]
+            shared, sizes = shared[~stale], sizes[~stale]
+            fresh = [
+                (position, len(np.intersect1d(codes, title_codes)),
+                 len(title_codes))
+                for position, title_codes in self.dirty.items()
+                if title_codes is not None
+            ]
+            fresh = np.array([row for row in fresh if row[1]],
+                             dtype=np.int64).reshape(-1, 3)
+            candidates = np.concatenate([candidates, fresh[:, 0]])
+            shared = np.concatenate([shared, fresh[:, 1]])
+            sizes = np.concatenate([sizes, fresh[:, 2]])
+        scores = shared / (total + sizes - shared)
+        matched = scores >= threshold
+        candidates, scores = candidates[matched], scores[matched]
+        if len(candidates) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[best], scores[best]
+        order = np.lexsort((candidates, -scores))
+        return candidates[order], scores[order]
+
+    def save(self, path, ids, names):
+        """Сохранить индекс вместе с id и названиями позиций."""
+        vocabulary = np.empty(len(self.vocabulary), dtype='<U3')
+        for gram, code in self.vocabulary.items():
+            vocabulary[code] = gram
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as file:
+            np.savez(
+                file, vocabulary=vocabulary, postings=self.postings,
+                starts=self.starts, sizes=self.sizes, ids=np.asarray(ids),
+                names=np.array([name or '' for name in names])
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, ids, names):
+        """Загрузить сохранённый индекс и сверить его с текущими позициями.
+
+        Позиции, чьи id или названия разошлись со снимком, считаются
+        изменёнными и досчитываются как dirty.
+        """
+        index = cls()
+        with np.load(path) as snapshot:
+            index.vocabulary = {
+                gram: code
+                for code, gram in enumerate(snapshot['vocabulary'].tolist())
+            }
+            old_ids, old_names = snapshot['ids'], snapshot['names']
+            postings, starts = snapshot['postings'], snapshot['starts']
+            old_sizes = snapshot['sizes']
+        ids = np.asarray(ids, dtype=np.int64)
+        # None не совпадёт ни с одним сохранённым названием.
+        current = np.array(['\0' if name is None else name for name in names])
+        matched = np.zeros(len(old_ids), dtype=bool)
+        found = np.zeros(len(old_ids), dtype=np.int64)
+        if len(ids):
+            order = np.argsort(ids)
+            found = order[np.minimum(
+                np.searchsorted(ids[order], old_ids), len(ids) - 1
+            )]
+            matched = (ids[found] == old_ids) & (current[found] == old_names)
+        mapping = np.where(matched, found, -1)
+        index.sizes = np.zeros(len(ids), dtype=np.int64)
+        index.sizes[mapping[matched]] = old_sizes[matched]
+        codes = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+        owners = mapping[postings]
+        valid = owners >= 0
+        index.set_postings(codes[valid], owners[valid])
+        reused = np.zeros(len(ids), dtype=bool)
+        reused[mapping[matched]] = True
+        for position in np.flatnonzero(~reused).tolist():
+            if names[position] is not None:
+                index.update(position, names[position])
+        return index
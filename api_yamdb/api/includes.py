@@ -0,0 +1,63 @@
+"""Вложенные последние отзывы в списке произведений.
+
+?include=reviews&reviews_limit=N добавляет к каждому произведению
+страницы N его новых отзывов. Отзывы всех произведений страницы читаются
+одним запросом: ROW_NUMBER() OVER (PARTITION BY title_id ORDER BY
+pub_date DESC) нумерует отзывы внутри произведения, внешний SELECT
+оставляет первые N, а имя автора приходит в той же строке.
+"""
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import ValidationError
+
+from reviews.models import Review
+
+INCLUDES = ('reviews',)
+
+
+def reviews_limit(query_params):
+    """Число вложенных отзывов из запроса или None без ?include=reviews."""
+    include = query_params.get('include')
+    if include is None:
+        return None
+    if include not in INCLUDES:
+        raise ValidationError({'include': (
+            f'Доступные значения: {", ".join(INCLUDES)}.'
+        )})
+    maximum = settings.INCLUDED_REVIEWS_MAX
+    try:
+        limit = int(query_params.get(
+            'reviews_limit', settings.INCLUDED_REVIEWS_DEFAULT
+        ))
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= maximum:
+        raise ValidationError({'reviews_limit': (
+            f'Укажите число от 1 до {maximum}.'
+        )})
+    return limit
+
+
+def latest_reviews(title_ids, limit):
+    """Словарь title_id → до limit новых отзывов, от новых к старым."""
+    ranked = Review.objects.filter(title_id__in=title_ids).annotate(
+        row_number=Window(
+            RowNumber(), partition_by=[F('title_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]
+        ),
+        author_username=F('author__username')
+    ).order_by()
+    sql, params = ranked.query.sql_with_params()
+    reviews = {title_id: [] for title_id in title_ids}
+    for review in Review.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            f'ORDER BY title_id, row_number', (*params, limit)):
+        reviews[review.title_id].append(review)
+    return reviews
+
+
+def attach_reviews(titles, limit):
+    reviews = latest_reviews([title.pk for title in titles], limit)
+    for title in titles:
+        title.latest_reviews = reviews[title.pk]
@@ -0,0 +1,61 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить обработку одновременных запросов на чтение через WSGI '
+        '(пул потоков) и ASGI (один цикл событий). Медленный клиент '
+        'имитируется задержкой, пока соединение занято ответом. Для '
+        'асинхронного чтения запускайте с YAMDB_ASYNC_READS=1.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/v1/titles/')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--wsgi-threads', type=int, default=8)
+        parser.add_argument('--delay', type=float, default=0.05)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'ASYNC_READS: {settings.ASYNC_READS}')
+        for name, bench in (('WSGI', self.bench_wsgi),
+                            ('ASGI', self.bench_asgi)):
+            started = time.perf_counter()
+            bench(options)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{name}: {options["requests"]} запросов за '
+                f'{elapsed:.2f} с ({options["requests"] / elapsed:.0f} rps)'
+            )
+
+    def bench_wsgi(self, options):
+        def request(_):
+            response = Client().get(options['path'])
+            time.sleep(options['delay'])
+            return response.status_code
+
+        with ThreadPoolExecutor(options['wsgi_threads']) as executor:
+            list(executor.map(request, range(options['requests'])))
+
+    def bench_asgi(self, options):
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(options['concurrency'])
+
+            async def request():
+                async with semaphore:
+                    response = await client.get(options['path'])
+                    await asyncio.sleep(options['delay'])
+                    return response.status_code
+
+            await asyncio.gather(
+                *(request() for _ in range(options['requests']))
+            )
+
+        asyncio.run(run())
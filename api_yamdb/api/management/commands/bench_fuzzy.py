@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.fuzzy import TrigramIndex
+
+SYLLABLES = (
+    'ка', 'ро', 'ми', 'на', 'те', 'до', 'лу', 'ви', 'зо', 'ре', 'сту', 'пра',
+    'гло', 'бер', 'шан', 'фил', 'мор', 'ток', 'ля', 'юр'
+)
+
+
+def generate_name(rng):
+    return ' '.join(
+        ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        for _ in range(rng.randint(1, 3))
+    )
+
+
+def misspell(rng, name):
+    position = rng.randrange(len(name))
+    return name[:position] + rng.choice('аеиоу') + name[position + 1:]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замерить построение, сохранение, загрузку и поиск триграммного '
+        'индекса на сгенерированном каталоге (без записи в БД).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        names = [generate_name(rng) for _ in range(options['titles'])]
+        ids = list(range(1, len(names) + 1))
+
+        started = time.perf_counter()
+        index = TrigramIndex()
+        index.build(names)
+        self.report('Построение', started)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trigrams.npz')
+            started = time.perf_counter()
+            index.save(path, ids, names)
+            self.report('Сохранение', started)
+            started = time.perf_counter()
+            index = TrigramIndex.load(path, ids, names)
+            self.report('Загрузка', started)
+
+        queries = [misspell(rng, rng.choice(names))
+                   for _ in range(options['queries'])]
+        started = time.perf_counter()
+        for query in queries:
+            index.search(query, settings.FUZZY_SEARCH_LIMIT,
+                         settings.FUZZY_SEARCH_THRESHOLD)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Поиск: {elapsed / len(queries) * 1000:.2f} мс на запрос '
+            f'({len(names)} названий).'
+        )
+
+    def report(self, stage, started):
+        self.stdout.write(
+            f'{stage}: {time.perf_counter() - started:.2f} с.'
+        )
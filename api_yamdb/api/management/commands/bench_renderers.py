@@ -0,0 +1,46 @@
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer, orjson
+from api.views import TitleViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить скорость JSON-рендереров на страницах /api/v1/titles/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        view = TitleViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        pages = []
+        for page in range(1, options['pages'] + 1):
+            response = view(factory.get('/api/v1/titles/', {'page': page}))
+            if response.status_code != 200:
+                break
+            pages.append(response.data)
+        if not pages:
+            self.stdout.write('Нет данных: выполните import_csv.')
+            return
+        self.stdout.write(
+            f'Страниц: {len(pages)}, orjson: '
+            f'{"есть" if orjson is not None else "нет"}'
+        )
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            size = sum(len(renderer.render(data)) for data in pages)
+            seconds = timeit(
+                lambda: [renderer.render(data) for data in pages],
+                number=options['repeat']
+            )
+            per_page = seconds / options['repeat'] / len(pages) * 10 ** 6
+            self.stdout.write(
+                f'{type(renderer).__name__}: {per_page:.1f} мкс/страница, '
+                f'{size} байт'
+            )
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog import catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Построить триграммный индекс названий и сохранить снимок, который '
+        'процессы загружают вместо построения с нуля.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.FUZZY_INDEX_PATH)
+
+    def handle(self, *args, **options):
+        if not options['path']:
+            raise CommandError(
+                'Укажите --path или переменную YAMDB_FUZZY_INDEX_PATH.'
+            )
+        started = time.perf_counter()
+        catalog.save_trigrams(options['path'])
+        self.stdout.write(
+            f'Триграммный индекс сохранён в {options["path"]} за '
+            f'{time.perf_counter() - started:.2f} с.'
+        )
@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def compress_sequence_with(compressor, sequence):
+    """Сжимать поток частями, не дожидаясь конца ответа."""
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=5)
+
+    def process(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+class ZstdStream:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def process(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+
+# Кодировки в порядке предпочтения сервера.
+ENCODINGS = {}
+if brotli is not None:
+    ENCODINGS['br'] = (
+        lambda content: brotli.compress(content, quality=5),
+        lambda sequence: compress_sequence_with(BrotliStream(), sequence),
+    )
+if zstandard is not None:
+    ENCODINGS['zstd'] = (
+        lambda content: zstandard.ZstdCompressor(level=3).compress(content),
+        lambda sequence: compress_sequence_with(ZstdStream(), sequence),
+    )
+ENCODINGS['gzip'] = (compress_string, compress_sequence)
+
+
+def parse_accept_encoding(header):
+    """Кодировки, которые клиент принимает (q > 0) и явно отвергает (q=0)."""
+    accepted, refused = set(), set()
+    for item in header.split(','):
+        name, *params = item.strip().split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        name = name.strip().lower()
+        if name:
+            (accepted if quality > 0 else refused).add(name)
+    return accepted, refused
+
+
+def choose_encoding(header):
+    accepted, refused = parse_accept_encoding(header)
+    for encoding in ENCODINGS:
+        # «*» не разрешает кодировки, отвергнутые явно (RFC 9110, 12.5.3).
+        if encoding in accepted or (
+                '*' in accepted and encoding not in refused):
+            return encoding
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжатие ответов с учётом Accept-Encoding: br, zstd или gzip.
+
+    Короткие ответы (меньше COMPRESSION_MIN_SIZE байт) не сжимаются,
+    потоковые ответы сжимаются по частям.
+    """
+
+    def process_response(self, request, response):
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = ENCODINGS[encoding][1](
+                response.streaming_content
+            )
+            del response.headers['Content-Length']
+        else:
+            compressed = ENCODINGS[encoding][0](response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
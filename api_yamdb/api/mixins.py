@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Case, IntegerField, When
+from rest_framework.exceptions import ValidationError
+
+from reviews.constants import MAX_ID
+
+
+class AtomicWriteMixin:
+    """Создание, изменение и удаление объекта в одной транзакции.
+
+    Сигналы post_save и post_delete пишут журнал изменений, рейтинги и
+    счётчики; сбой между ними и записью объекта откатывает всё вместе.
+    """
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+
+class MultiGetMixin:
+    """?ids= в списке: объекты по перечню значений lookup_field.
+
+    Все объекты читаются одним запросом с теми же select_related и
+    prefetch_related, что и список, в порядке перечня и без пагинации.
+    Несуществующие значения пропускаются.
+    """
+
+    multi_get_param = 'ids'
+
+    def get_multi_get_ids(self):
+        if self.action != 'list':
+            return None
+        value = self.request.query_params.get(self.multi_get_param)
+        if value is None:
+            return None
+        model = self.get_queryset().model
+        field = model._meta.pk if self.lookup_field == 'pk' else (
+            model._meta.get_field(self.lookup_field)
+        )
+        maximum = settings.MULTI_GET_MAX_IDS
+        try:
+            ids = list(dict.fromkeys(
+                field.to_python(part.strip())
+                for part in value.split(',') if part.strip()
+            ))
+        except DjangoValidationError:
+            ids = []
+        if isinstance(field, IntegerField) and any(
+                abs(key) > MAX_ID for key in ids):
+            # Такое число не передать в запрос к БД.
+            ids = []
+        if not 0 < len(ids) <= maximum:
+            raise ValidationError({self.multi_get_param: (
+                f'Укажите через запятую от 1 до {maximum} значений '
+                f'{self.lookup_field}.'
+            )})
+        return ids
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        ids = self.get_multi_get_ids()
+        if ids is None:
+            return queryset
+        return queryset.filter(**{f'{self.lookup_field}__in': ids}).order_by(
+            Case(
+                *(When(**{self.lookup_field: key}, then=position)
+                  for position, key in enumerate(ids)),
+                output_field=IntegerField()
+            )
+        )
+
+    def paginate_queryset(self, queryset):
+        if self.multi_get_param in self.request.query_params:
+            return None
+        return super().paginate_queryset(queryset)
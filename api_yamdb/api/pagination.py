@@ -0,0 +1,163 @@
+import hashlib
+import json
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+def count_version_key(table):
+    return f'pagination:version:{table}'
+
+
+def bump_count_version(model):
+    """Сбросить закэшированные количества для запросов к таблице модели.
+
+    Версия — случайная строка, а не счётчик: после вытеснения ключа из
+    кэша номер не начнётся заново и не совпадёт со старым.
+    """
+    cache.set(count_version_key(model._meta.db_table), uuid.uuid4().hex, None)
+
+
+def count_versions(tables):
+    """Версии таблиц; отсутствующим в кэше назначаются новые."""
+    keys = [count_version_key(table) for table in tables]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, '') for key in keys]
+
+
+def estimate_count(queryset):
+    """Оценка количества строк по плану запроса (только PostgreSQL)."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.explain(format='json'))
+    return plan[0]['Plan']['Plan Rows']
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, берущий COUNT(*) из кэша.
+
+    Ключ строится по SQL-запросу и версиям всех таблиц запроса, которые
+    меняют сигналы записи, поэтому изменение данных сбрасывает кэш.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        query = self.object_list.query
+        try:
+            sql = str(query)
+        except EmptyResultSet:
+            return 0
+        tables = sorted({join.table_name for join in query.alias_map.values()})
+        key = 'pagination:count:{}'.format(hashlib.sha1(
+            ':'.join([sql, *count_versions(tables)]).encode()
+        ).hexdigest())
+        cached = cache.get(key)
+        if cached is not None:
+            self.estimated, count = cached
+            return count
+        count = None
+        threshold = settings.PAGINATION_ESTIMATE_THRESHOLD
+        if threshold is not None:
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate > threshold:
+                self.estimated, count = True, estimate
+        if count is None:
+            count = super().count
+        cache.set(
+            key, (self.estimated, count),
+            settings.PAGINATION_COUNT_CACHE_TIMEOUT
+        )
+        return count
+
+
+class UncountedPage:
+    """Страница без подсчёта общего количества объектов."""
+
+    def __init__(self, object_list, number, page_size):
+        rows = list(object_list)
+        self.object_list = rows[:page_size]
+        self.number = number
+        self._has_next = len(rows) > page_size
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Постраничная выдача с кэшируемым count.
+
+    Параметр ?count=false отключает подсчёт: в ответе не будет ключа
+    count, а наличие следующей страницы определяется по лишней строке.
+    """
+
+    django_paginator_class = CachedCountPaginator
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.with_count = request.query_params.get(
+            self.count_query_param, ''
+        ).lower() not in FALSE_VALUES
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise NotFound(self.invalid_page_message)
+        offset = (number - 1) * page_size
+        self.page = UncountedPage(
+            queryset[offset:offset + page_size + 1], number, page_size
+        )
+        if number > 1 and not self.page.object_list:
+            raise NotFound(self.invalid_page_message)
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.with_count:
+            response = super().get_paginated_response(data)
+            if self.page.paginator.estimated:
+                response.data['count_estimated'] = True
+            return response
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
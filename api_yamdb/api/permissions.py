@@ -6,6 +6,13 @@ class IsAdmin(permissions.BasePermission):
         return request.user.is_authenticated and request.user.is_admin
 
 
+class IsModerator(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_moderator or request.user.is_admin
+        )
+
+
 class IsAuthorOrAdminOrReadOnly(IsAdmin):
     def has_permission(self, request, view):
         return (request.method in permissions.SAFE_METHODS
@@ -1,5 +1,7 @@
 from datetime import date
+import uuid
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import IntegrityError
@@ -8,7 +10,8 @@ from rest_framework import serializers
 from reviews.constants import (
     USERNAME_MAX_LENGTH, EMAIL_MAX_LENGTH, MIN_RATING, MAX_RATING
 )
-from reviews.models import Category, Genre, Title, Review, Comment
+from reviews.models import (Category, CategoryStats, Genre, GenreStats, Title,
+                            Review, Comment)
 from reviews.validators import forbidden_usernames
 
 
@@ -39,6 +42,79 @@ class TitleReadSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class TitleSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    year = serializers.IntegerField()
+    rating = serializers.IntegerField(allow_null=True)
+
+
+class LeaderboardSerializer(TitleReadSerializer):
+    weighted_rating = serializers.FloatField(read_only=True)
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + ('weighted_rating',)
+        read_only_fields = fields
+
+
+class SimilarTitleSerializer(TitleReadSerializer):
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + ('similarity',)
+        read_only_fields = fields
+
+
+class TrendingSerializer(TitleReadSerializer):
+    recent_reviews = serializers.IntegerField(read_only=True)
+    trend = serializers.FloatField(read_only=True)
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + ('recent_reviews', 'trend')
+        read_only_fields = fields
+
+
+class GenreStatsSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='genre.name')
+    slug = serializers.SlugField(source='genre.slug')
+    average_score = serializers.FloatField()
+
+    class Meta:
+        model = GenreStats
+        fields = (
+            'name', 'slug', 'titles_count', 'reviews_count', 'average_score'
+        )
+        read_only_fields = fields
+
+
+class CategoryStatsSerializer(GenreStatsSerializer):
+    name = serializers.CharField(source='category.name')
+    slug = serializers.SlugField(source='category.slug')
+
+    class Meta(GenreStatsSerializer.Meta):
+        model = CategoryStats
+
+
+class RatingHistoryQuerySerializer(serializers.Serializer):
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+
+
+class RatingHistorySerializer(serializers.Serializer):
+    day = serializers.DateField()
+    reviews_count = serializers.IntegerField()
+    average = serializers.FloatField()
+    rating = serializers.FloatField()
+
+
+class RecommendationSerializer(TitleReadSerializer):
+    predicted_rating = serializers.FloatField(read_only=True)
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + ('predicted_rating',)
+        read_only_fields = fields
+
+
 class TitleCreateUpdateSerializer(serializers.ModelSerializer):
     genre = serializers.SlugRelatedField(
         many=True, queryset=Genre.objects.all(), slug_field='slug'
@@ -92,6 +168,23 @@ class ReviewSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class EmbeddedReviewSerializer(serializers.ModelSerializer):
+    author = serializers.CharField(source='author_username')
+
+    class Meta:
+        model = Review
+        fields = ('id', 'text', 'author', 'score', 'pub_date')
+        read_only_fields = fields
+
+
+class TitleWithReviewsSerializer(TitleReadSerializer):
+    latest_reviews = EmbeddedReviewSerializer(many=True, read_only=True)
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + ('latest_reviews',)
+        read_only_fields = fields
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
@@ -104,6 +197,35 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date')
 
 
+class FeedEntrySerializer(serializers.Serializer):
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    text = serializers.CharField()
+    author = serializers.CharField(source='author_username')
+    pub_date = serializers.DateTimeField()
+    title_id = serializers.IntegerField()
+    review_id = serializers.IntegerField(required=False)
+    score = serializers.IntegerField(required=False)
+
+
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(('GET', 'POST', 'PATCH', 'DELETE'))
+    url = serializers.RegexField(r'^/api/v1/(?!batch/)')
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'Не больше {settings.BATCH_MAX_REQUESTS} запросов.'
+            )
+        return value
+
+
 User = get_user_model()
 
 
@@ -134,10 +256,15 @@ class RegisterSerializer(serializers.Serializer):
     def create(self, validated_data):
         username = validated_data['username']
         email = validated_data['email']
+        confirmation_code = uuid.uuid4()
+        # Повторный запрос кода: одним UPDATE находим пользователя
+        # и меняем только confirmation_code, не перечитывая строку.
+        if User.objects.filter(**validated_data).update(
+                confirmation_code=confirmation_code):
+            return User(confirmation_code=confirmation_code, **validated_data)
         try:
-            user, created = User.objects.get_or_create(
-                username=username, email=email)
-            return user
+            return User.objects.create(
+                confirmation_code=confirmation_code, **validated_data)
         except IntegrityError:
             if User.objects.filter(username=username).exists():
                 raise serializers.ValidationError(
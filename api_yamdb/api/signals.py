@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Category, Comment, Genre, Review, Title
+from . import events
+from .catalog import catalog
+from .pagination import bump_count_version
+from .serializers import CommentSerializer, ReviewSerializer
+
+PAGINATED_MODELS = (
+    Category, Genre, Title, Review, Comment, get_user_model()
+)
+
+
+def reset_counts(sender, **kwargs):
+    bump_count_version(sender)
+
+
+for model in PAGINATED_MODELS:
+    post_save.connect(reset_counts, sender=model)
+    post_delete.connect(reset_counts, sender=model)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Genre)
+def reset_title_stats_counts(sender, **kwargs):
+    # Отзывы и жанры меняют хранимые рейтинг и маску жанров произведений.
+    bump_count_version(Title)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def reset_title_genre_counts(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_count_version(sender)
+        bump_count_version(Title)
+
+
+def refresh_catalog(title_ids):
+    # Без CATALOG_INDEX_ENABLED индексом пользуется только нечёткий
+    # поиск, и он догоняет журнал изменений сам.
+    if settings.CATALOG_INDEX_ENABLED:
+        transaction.on_commit(lambda: catalog.refresh(title_ids))
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_catalog_changed(sender, instance, **kwargs):
+    refresh_catalog([instance.pk])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_catalog_changed(sender, instance, **kwargs):
+    refresh_catalog([instance.title_id])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_catalog_changed(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        refresh_catalog([instance.pk])
+    elif action == 'post_clear' or not pk_set:
+        # Список произведений жанра после clear уже неизвестен.
+        invalidate_catalog()
+    else:
+        refresh_catalog(list(pk_set))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def invalidate_catalog(**kwargs):
+    if settings.CATALOG_INDEX_ENABLED:
+        transaction.on_commit(catalog.invalidate)
+
+
+@receiver(post_save, sender=Review)
+def review_published(sender, instance, created, **kwargs):
+    if created and events.has_subscribers(instance.title_id):
+        data = ReviewSerializer(instance).data
+        transaction.on_commit(
+            lambda: events.publish(instance.title_id, 'review', data)
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_published(sender, instance, created, **kwargs):
+    if not created:
+        return
+    title_id = instance.review.title_id
+    if events.has_subscribers(title_id):
+        data = {
+            **CommentSerializer(instance).data, 'review': instance.review_id
+        }
+        transaction.on_commit(
+            lambda: events.publish(title_id, 'comment', data)
+        )
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections.abc import Mapping
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+class LocalBucketStore:
+    """Хранилище корзин токенов в памяти процесса.
+
+    Корзины лежат в порядке последнего обращения; при переполнении
+    удаляется сразу пачка давно не используемых, так что вытеснение
+    стоит O(1) в среднем на запрос.
+    """
+
+    max_buckets = 100_000
+    evict_batch = 10_000
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, now):
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self.buckets) >= self.max_buckets:
+                self.evict()
+            self.buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def evict(self):
+        """Удалить evict_batch корзин, к которым дольше всего не обращались."""
+        for key in list(islice(self.buckets, self.evict_batch)):
+            del self.buckets[key]
+
+
+class CacheBucketStore:
+    """Хранилище корзин токенов в кэше Django, общее для процессов.
+
+    С бэкендом Redis или Memcached корзины видны всем воркерам;
+    локально его заменяет LocMemCache. Чтение и запись корзины идут под
+    блокировкой на cache.add, чтобы параллельные запросы не потратили
+    одни и те же токены; не дождавшийся блокировки запрос отклоняется.
+    """
+
+    lock_timeout = 1
+    lock_attempts = 20
+    lock_wait = 0.005
+
+    def consume(self, key, capacity, refill_rate, now):
+        key = f'throttle:{key}'
+        lock = f'{key}:lock'
+        for _ in range(self.lock_attempts):
+            if cache.add(lock, 1, self.lock_timeout):
+                break
+            time.sleep(self.lock_wait)
+        else:
+            return False, 0
+        try:
+            tokens, updated = cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            cache.set(key, (tokens, now), int(capacity / refill_rate) + 1)
+        finally:
+            cache.delete(lock)
+        return allowed, tokens
+
+
+_stores = {}
+
+
+def get_bucket_store():
+    path = settings.THROTTLE_BUCKET_STORE
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+def reset_bucket_stores():
+    """Забыть состояние всех корзин (используется в тестах)."""
+    _stores.clear()
+
+
+def parse_rate(rate):
+    """'5/min' -> (ёмкость корзины, скорость пополнения в секунду)."""
+    try:
+        capacity, period = rate.split('/')
+        capacity = int(capacity)
+        seconds = PERIODS[period[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f'Некорректный лимит запросов: {rate}')
+    return capacity, capacity / seconds
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ограничение частоты запросов по алгоритму token bucket.
+
+    Лимит берётся из DEFAULT_THROTTLE_RATES по scope, корзина заводится
+    на каждый ключ из get_keys().
+    """
+
+    scope = None
+
+    def get_keys(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        capacity, self.refill_rate = parse_rate(
+            api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        )
+        store = get_bucket_store()
+        now = time.time()
+        self.deficit = 0
+        for key in self.get_keys(request, view):
+            allowed, tokens = store.consume(
+                f'{self.scope}:{key}', capacity, self.refill_rate, now
+            )
+            if not allowed:
+                self.deficit = max(self.deficit, 1 - tokens)
+        return not self.deficit
+
+    def wait(self):
+        return self.deficit / self.refill_rate
+
+
+class IPThrottle(TokenBucketThrottle):
+
+    def get_keys(self, request, view):
+        return (self.get_ident(request),)
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = 'signup_ip'
+
+
+class TokenIPThrottle(IPThrottle):
+    scope = 'token_ip'
+
+
+class SignupIdentityThrottle(TokenBucketThrottle):
+    """Лимит на повторные регистрации одного username и email."""
+
+    scope = 'signup_identity'
+
+    def get_keys(self, request, view):
+        # Тело не объект (например, JSON-массив) — ключей по имени нет.
+        if not isinstance(request.data, Mapping):
+            return ()
+        return tuple(
+            f'{field}:{str(request.data[field]).lower()}'
+            for field in ('username', 'email')
+            if request.data.get(field)
+        )
+
+
+class TokenUsernameThrottle(TokenBucketThrottle):
+    """Лимит на подбор кода подтверждения для одного username."""
+
+    scope = 'token_username'
+
+    def get_keys(self, request, view):
+        if not isinstance(request.data, Mapping):
+            return ()
+        username = request.data.get('username')
+        return (f'username:{username}',) if username else ()
@@ -4,7 +4,9 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryViewSet, GenreViewSet, TitleViewSet,
     ReviewViewSet, CommentViewSet, UserViewSet,
-    token_obtain, register_code_obtain
+    GenreStatsViewSet, CategoryStatsViewSet,
+    activity_feed, batch_requests, change_feed, token_obtain,
+    register_code_obtain
 )
 
 app_name = 'api'
@@ -19,6 +21,10 @@ router_v1.register(r'titles/(?P<title_id>\d+)/reviews', ReviewViewSet,
 router_v1.register(r'titles/(?P<title_id>\d+)/reviews/'
                    r'(?P<review_id>\d+)/comments',
                    CommentViewSet, basename='comments')
+router_v1.register(r'analytics/genres', GenreStatsViewSet,
+                   basename='genre-stats')
+router_v1.register(r'analytics/categories', CategoryStatsViewSet,
+                   basename='category-stats')
 
 auth = [
     path('token/', token_obtain, name='token_obtain'),
@@ -26,6 +32,9 @@ auth = [
 ]
 
 urlpatterns = [
+    path('v1/activity/', activity_feed, name='activity'),
+    path('v1/changes/', change_feed, name='changes'),
+    path('v1/batch/', batch_requests, name='batch'),
     path('v1/', include(router_v1.urls)),
     path('v1/auth/', include(auth)),
 ]
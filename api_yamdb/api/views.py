@@ -1,33 +1,52 @@
 import uuid
 
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.core.mail import send_mail
-from django.db.models import Avg
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, permissions
-from rest_framework.decorators import action, api_view
-from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.mixins import (
     CreateModelMixin, ListModelMixin, DestroyModelMixin
 )
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework_simplejwt import tokens
 
 from api_yamdb.settings import YAMDB_EMAIL
-from reviews.models import Category, Genre, Title, Review
-from .filters import TitleFilter
-from .permissions import (IsAdminOrReadOnly, IsAdmin,
+from reviews import (activity, changes, history, leaderboard,
+                     recommendations)
+from reviews.constants import MAX_ID
+from reviews.models import (Category, CategoryStats, Genre, GenreStats, Title,
+                            Review)
+from . import batch, catalog, facets, feed, includes
+from .async_views import AsyncReadMixin
+from .filters import StableOrderingFilter, TitleFilter
+from .mixins import AtomicWriteMixin, MultiGetMixin
+from .permissions import (IsAdminOrReadOnly, IsAdmin, IsModerator,
                           IsAuthorOrAdminOrReadOnly)
 from .serializers import (CategorySerializer, GenreSerializer,
                           TitleReadSerializer, TitleCreateUpdateSerializer,
+                          LeaderboardSerializer, TitleSuggestionSerializer,
+                          SimilarTitleSerializer, RecommendationSerializer,
+                          TrendingSerializer, RatingHistorySerializer,
+                          RatingHistoryQuerySerializer, GenreStatsSerializer,
+                          CategoryStatsSerializer, TitleWithReviewsSerializer,
                           ReviewSerializer, CommentSerializer,
+                          FeedEntrySerializer, BatchSerializer,
                           UserSerializer, UserInfoSerializer,
                           RegisterSerializer, TokenObtainSerializer)
+from .throttling import (SignupIPThrottle, SignupIdentityThrottle,
+                         TokenIPThrottle, TokenUsernameThrottle)
 
 
-class BaseClassificationViewSet(CreateModelMixin,
+class BaseClassificationViewSet(AsyncReadMixin,
+                                AtomicWriteMixin,
+                                CreateModelMixin,
                                 ListModelMixin,
                                 DestroyModelMixin,
                                 GenericViewSet):
@@ -47,34 +66,232 @@ class GenreViewSet(BaseClassificationViewSet):
     serializer_class = GenreSerializer
 
 
-class TitleViewSet(ModelViewSet):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).order_by('name')
-    filter_backends = (DjangoFilterBackend,)
+class BaseStatsViewSet(ListModelMixin, GenericViewSet):
+    permission_classes = (IsAdmin,)
+    filter_backends = (filters.OrderingFilter,)
+    ordering_fields = ('titles_count', 'reviews_count')
+    ordering = ('-reviews_count', 'pk')
+
+
+class GenreStatsViewSet(BaseStatsViewSet):
+    queryset = GenreStats.objects.select_related('genre')
+    serializer_class = GenreStatsSerializer
+
+
+class CategoryStatsViewSet(BaseStatsViewSet):
+    queryset = CategoryStats.objects.select_related('category')
+    serializer_class = CategoryStatsSerializer
+
+
+class TitleViewSet(AsyncReadMixin, AtomicWriteMixin, MultiGetMixin,
+                   ModelViewSet):
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
+    filter_backends = (DjangoFilterBackend, StableOrderingFilter)
+    ordering_fields = ('rating', 'year', 'reviews_count', 'name')
+    ordering = ('name',)
     http_method_names = ['get', 'post', 'patch', 'delete']
     permission_classes = (IsAdminOrReadOnly,)
     filterset_class = TitleFilter
 
+    reviews_limit = None
+
     def get_serializer_class(self):
+        if self.action == 'list' and self.reviews_limit:
+            return TitleWithReviewsSerializer
         if self.action in ['list', 'retrieve']:
             return TitleReadSerializer
+        if self.action == 'top':
+            return LeaderboardSerializer
+        if self.action == 'autocomplete':
+            return TitleSuggestionSerializer
+        if self.action == 'similar':
+            return SimilarTitleSerializer
+        if self.action == 'trending':
+            return TrendingSerializer
+        if self.action == 'rating_history':
+            return RatingHistorySerializer
         return TitleCreateUpdateSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list' and self.reviews_limit and args:
+            titles = list(args[0])
+            includes.attach_reviews(titles, self.reviews_limit)
+            args = (titles, *args[1:])
+        return super().get_serializer(*args, **kwargs)
+
+    def get_limit(self, default, maximum):
+        """Параметр ?limit= от 1 до maximum."""
+        try:
+            limit = int(self.request.query_params.get('limit', default))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= maximum:
+            raise ValidationError({'limit': (
+                f'Укажите число от 1 до {maximum}.'
+            )})
+        return limit
+
+    def list(self, request, *args, **kwargs):
+        """Список произведений.
+
+        ?facets= добавляет счётчики фасетов, ?include=reviews — новые
+        отзывы каждого произведения, ?ids= выбирает произведения по id.
+        """
+        if self.multi_get_param in request.query_params and (
+                'facets' in request.query_params
+                or 'fuzzy' in request.query_params):
+            raise ValidationError({self.multi_get_param: (
+                'Не сочетается с ?facets= и ?fuzzy=.'
+            )})
+        names = request.query_params.get('facets')
+        if names is not None:
+            names = facets.parse(names)
+        self.reviews_limit = includes.reviews_limit(request.query_params)
+        response = self.list_titles(request, *args, **kwargs)
+        if names is not None:
+            queryset = self.filter_queryset(self.get_queryset())
+            if 'fuzzy' in request.query_params:
+                queryset = queryset.filter(pk__in=self.fuzzy_ids)
+            response.data['facets'] = facets.counts(queryset, names)
+        return response
+
+    def list_titles(self, request, *args, **kwargs):
+        if 'fuzzy' in request.query_params:
+            return self.fuzzy_list(request.query_params['fuzzy'])
+        if not settings.CATALOG_INDEX_ENABLED:
+            return super().list(request, *args, **kwargs)
+        title_ids = catalog.search(
+            request.query_params,
+            DjangoFilterBackend().get_filterset(
+                request, self.get_queryset(), self
+            )
+        )
+        if title_ids is None:
+            return super().list(request, *args, **kwargs)
+        return self.list_ids(title_ids)
+
+    def fuzzy_list(self, query):
+        """Нечёткий поиск: похожие названия, от самых похожих.
+
+        Остальные параметры фильтра сужают найденное через БД.
+        """
+        if not query.strip():
+            raise ValidationError({'fuzzy': 'Укажите строку поиска.'})
+        title_ids = self.fuzzy_ids = catalog.fuzzy(
+            query, settings.FUZZY_SEARCH_LIMIT
+        )
+        matched = set(self.filter_queryset(self.get_queryset()).filter(
+            pk__in=title_ids
+        ).values_list('pk', flat=True))
+        return self.list_ids(
+            [title_id for title_id in title_ids if title_id in matched]
+        )
+
+    def list_ids(self, title_ids):
+        page = self.paginate_queryset(title_ids)
+        titles = self.get_queryset().in_bulk(page)
+        return self.get_paginated_response(self.get_serializer(
+            [titles[title_id] for title_id in page if title_id in titles],
+            many=True
+        ).data)
+
+    @action(detail=False, url_path='top')
+    def top(self, request):
+        partition = leaderboard.ALL
+        if 'genre' in request.query_params:
+            partition = leaderboard.genre_partition(get_object_or_404(
+                Genre, slug=request.query_params['genre']
+            ).id)
+        elif 'category' in request.query_params:
+            partition = leaderboard.category_partition(get_object_or_404(
+                Category, slug=request.query_params['category']
+            ).id)
+        limit = self.get_limit(10, settings.LEADERBOARD_SIZE)
+        return Response(leaderboard.top(partition, limit, self.load_top))
+
+    @action(detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'Укажите начало названия.'})
+        limit = self.get_limit(
+            settings.AUTOCOMPLETE_SIZE, settings.AUTOCOMPLETE_MAX_SIZE
+        )
+        return Response(self.get_serializer(
+            catalog.autocomplete(query, limit), many=True
+        ).data)
+
+    @action(detail=False, url_path='trending')
+    def trending(self, request):
+        window = request.query_params.get('window', '24h')
+        if window not in activity.WINDOWS:
+            raise ValidationError({'window': (
+                f'Укажите одно из окон: {", ".join(activity.WINDOWS)}.'
+            )})
+        limit = self.get_limit(10, settings.TRENDING_SIZE)
+        entries = activity.trending(window, limit)
+        titles = self.get_queryset().in_bulk(
+            [title_id for title_id, _, _ in entries]
+        )
+        for title_id, count, trend in entries:
+            if title_id in titles:
+                titles[title_id].recent_reviews = count
+                titles[title_id].trend = trend
+        return Response(self.get_serializer(
+            [titles[title_id] for title_id, _, _ in entries
+             if title_id in titles],
+            many=True
+        ).data)
+
+    @action(detail=True, url_path='rating-history')
+    def rating_history(self, request, pk=None):
+        query = RatingHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(self.get_serializer(
+            history.series(self.get_object().pk, **query.validated_data),
+            many=True
+        ).data)
+
+    @action(detail=True, url_path='similar')
+    def similar(self, request, pk=None):
+        entries = self.get_object().similar_entries.order_by(
+            '-score', 'similar_id'
+        ).values_list('similar_id', 'score')
+        titles = self.get_queryset().in_bulk(
+            [title_id for title_id, _ in entries]
+        )
+        for title_id, score in entries:
+            titles[title_id].similarity = score
+        return Response(self.get_serializer(
+            [titles[title_id] for title_id, _ in entries], many=True
+        ).data)
+
+    def load_top(self, entries):
+        titles = self.get_queryset().in_bulk(
+            [title_id for title_id, _ in entries]
+        )
+        for title_id, score in entries:
+            titles[title_id].weighted_rating = score
+        return self.get_serializer(
+            [titles[title_id] for title_id, _ in entries], many=True
+        ).data
+
 
-class BaseContentViewSet(ModelViewSet):
+class BaseContentViewSet(AsyncReadMixin, AtomicWriteMixin, ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete']
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
 
 
-class ReviewViewSet(BaseContentViewSet):
+class ReviewViewSet(MultiGetMixin, BaseContentViewSet):
     serializer_class = ReviewSerializer
 
     def get_title(self):
         return get_object_or_404(Title, id=self.kwargs.get('title_id'))
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.get_title().reviews.select_related('author')
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, title=self.get_title())
@@ -97,7 +314,7 @@ class CommentViewSet(BaseContentViewSet):
 User = get_user_model()
 
 
-class UserViewSet(ModelViewSet):
+class UserViewSet(MultiGetMixin, ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     lookup_field = 'username'
@@ -121,17 +338,97 @@ class UserViewSet(ModelViewSet):
             serializer.save()
         return Response(self.get_serializer(request.user).data)
 
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        serializer_class=RecommendationSerializer,
+        url_path='me/recommendations'
+    )
+    def recommendations(self, request):
+        entries = recommendations.recommend(request.user.id)
+        titles = Title.objects.select_related('category').prefetch_related(
+            'genre'
+        ).in_bulk([title_id for title_id, _ in entries])
+        for title_id, predicted in entries:
+            if title_id in titles:
+                titles[title_id].predicted_rating = predicted
+        return Response(self.get_serializer(
+            [titles[title_id] for title_id, _ in entries
+             if title_id in titles],
+            many=True
+        ).data)
+
+
+@api_view(['GET'])
+@permission_classes((IsModerator,))
+def activity_feed(request):
+    """Новые отзывы и комментарии всего сайта, ?cursor= листает дальше."""
+    entries, cursor = feed.page(
+        request.query_params.get('cursor'), settings.ACTIVITY_FEED_PAGE_SIZE
+    )
+    return Response({
+        'next': cursor and replace_query_param(
+            request.build_absolute_uri(), 'cursor', cursor
+        ),
+        'results': FeedEntrySerializer(entries, many=True).data,
+    })
+
+
+@api_view(['GET'])
+def change_feed(request):
+    """Изменения каталога после курсора ?since=.
+
+    Без ?since= возвращает только текущий курсор: клиент загружает
+    каталог целиком и дальше запрашивает изменения от него.
+    """
+    if 'since' not in request.query_params:
+        return Response({
+            'cursor': changes.latest_cursor(), 'has_more': False,
+            'results': [],
+        })
+    try:
+        cursor = int(request.query_params['since'])
+    except ValueError:
+        cursor = -1
+    if not 0 <= cursor <= MAX_ID:
+        raise ValidationError(
+            {'since': 'Укажите курсор из прошлого ответа.'}
+        )
+    if changes.is_truncated(cursor):
+        return Response(
+            {'detail': 'Изменения после курсора удалены, загрузите '
+                       'каталог заново.'},
+            status=status.HTTP_410_GONE
+        )
+    limit = settings.CHANGES_PAGE_SIZE
+    entries = changes.since(cursor, limit + 1)
+    return Response({
+        'cursor': entries[:limit][-1]['cursor'] if entries else cursor,
+        'has_more': len(entries) > limit,
+        'results': entries[:limit],
+    })
+
+
+@api_view(['POST'])
+def batch_requests(request):
+    """Выполнить список подзапросов и вернуть их ответы по порядку."""
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return Response({'responses': batch.execute(
+        request, serializer.validated_data['requests'],
+        serializer.validated_data['parallel']
+    )})
+
 
 @api_view(['POST'])
+@throttle_classes((SignupIPThrottle, SignupIdentityThrottle))
 def register_code_obtain(request):
     serializer = RegisterSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     user = serializer.save()
-    user.confirmation_code = str(uuid.uuid4())
-    user.save()
     send_mail(
         subject='YAmdb confirmation code',
-        message=user.confirmation_code,
+        message=str(user.confirmation_code),
         from_email=YAMDB_EMAIL,
         recipient_list=[serializer.data['email']]
     )
@@ -139,20 +436,26 @@ def register_code_obtain(request):
 
 
 @api_view(['POST'])
+@throttle_classes((TokenIPThrottle, TokenUsernameThrottle))
 def token_obtain(request):
     serializer = TokenObtainSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     username = serializer.data['username']
-    user = get_object_or_404(User, username=username)
-    check_code = bool(
-        user.confirmation_code == serializer.data['confirmation_code']
-    )
-    user.confirmation_code = str(uuid.uuid4())
-    user.save()
-    if check_code:
-        return Response(
-            {'token': str(tokens.RefreshToken.for_user(user).access_token)}
-        )
+    users = User.objects.filter(username=username)
+    try:
+        confirmation_code = uuid.UUID(serializer.data['confirmation_code'])
+    except ValueError:
+        confirmation_code = None
+    # Код одноразовый: проверка и замена выполняются одним UPDATE,
+    # при неудачной попытке код тоже меняется.
+    if confirmation_code and users.filter(
+        confirmation_code=confirmation_code
+    ).update(confirmation_code=uuid.uuid4()):
+        return Response({'token': str(tokens.RefreshToken.for_user(
+            users.only('id').get()
+        ).access_token)})
+    if not users.update(confirmation_code=uuid.uuid4()):
+        raise NotFound()
     raise ValidationError(
         {'confirmation_code': 'Неверный код подтверждения'},
         code='invalid_confirmation_code',
@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ.setdefault('YAMDB_ASYNC_READS', '1')
 
 application = get_asgi_application()
+
+from api.events import with_event_streams  # noqa: E402
+
+application = with_event_streams(application)
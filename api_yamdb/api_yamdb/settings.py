@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,6 +57,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Асинхронное чтение списков под ASGI (включается в asgi.py)
+ASYNC_READS = os.getenv('YAMDB_ASYNC_READS', '0') == '1'
+
+ASYNC_READ_THREADS = int(os.getenv('YAMDB_ASYNC_READ_THREADS', '16'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -97,10 +104,33 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CachedCountPagination',
     'PAGE_SIZE': 10,
+    # Число доверенных прокси перед приложением; при 0 лимиты по IP берут
+    # REMOTE_ADDR и не верят присланному клиентом X-Forwarded-For
+    'NUM_PROXIES': int(os.getenv('YAMDB_NUM_PROXIES', '0')),
+    'DEFAULT_THROTTLE_RATES': {
+        'signup_ip': '20/min',
+        'signup_identity': '5/min',
+        'token_ip': '20/min',
+        'token_username': '5/min',
+    },
 }
 
+# Хранилище корзин токенов для ограничения частоты запросов к auth/:
+# api.throttling.LocalBucketStore (память процесса)
+# или api.throttling.CacheBucketStore (кэш Django, общий для воркеров)
+THROTTLE_BUCKET_STORE = 'api.throttling.LocalBucketStore'
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=999),
     'AUTH_HEADER_TYPES': ('Bearer',),
@@ -112,3 +142,101 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 YAMDB_EMAIL = 'yamdb@ya.ru'
+
+# Сжатие ответов: минимальный размер тела
+COMPRESSION_MIN_SIZE = 500
+
+# Кэш COUNT(*) для постраничных списков; оценка количества по плану
+# запроса (PostgreSQL) включается, если задан порог
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+PAGINATION_ESTIMATE_THRESHOLD = None
+
+# Отвечать на списки произведений из индекса каталога в памяти процесса
+CATALOG_INDEX_ENABLED = os.getenv('YAMDB_CATALOG_INDEX', '0') == '1'
+
+# Индекс каталога сверяется с журналом изменений не чаще раза в столько
+# секунд и перестраивается целиком, если изменилось больше произведений
+CATALOG_INDEX_SYNC_INTERVAL = 1
+
+CATALOG_INDEX_SYNC_LIMIT = 1000
+
+# Подсказки названий: число произведений по умолчанию и наибольшее
+AUTOCOMPLETE_SIZE = 10
+
+AUTOCOMPLETE_MAX_SIZE = 50
+
+# Нечёткий поиск ?fuzzy=: порог похожести по триграммам, число
+# результатов и необязательный файл снимка триграммного индекса
+FUZZY_SEARCH_THRESHOLD = 0.3
+
+FUZZY_SEARCH_LIMIT = 100
+
+FUZZY_INDEX_PATH = os.getenv('YAMDB_FUZZY_INDEX_PATH')
+
+# Рейтинг лучших произведений: байесовское среднее с априорной оценкой
+# LEADERBOARD_PRIOR_MEAN весом LEADERBOARD_PRIOR_VOTES отзывов
+LEADERBOARD_PRIOR_MEAN = 5.5
+
+LEADERBOARD_PRIOR_VOTES = 5
+
+LEADERBOARD_SIZE = 100
+
+# Сколько секунд страница рейтинга живёт в кэше. Сброс при записи виден
+# другим процессам только через общий кэш (Redis, Memcached); с кэшем в
+# памяти процесса устаревание ограничено этим временем
+LEADERBOARD_CACHE_TIMEOUT = 60
+
+# Похожие произведения: веса близости оценок и общих жанров, число
+# хранимых похожих и размер порции произведений при расчёте
+SIMILAR_REVIEWS_WEIGHT = 0.7
+
+SIMILAR_GENRES_WEIGHT = 0.3
+
+SIMILAR_TITLES_SIZE = 20
+
+SIMILARITY_CHUNK_SIZE = 500
+
+# Рекомендации пользователю: число произведений и время жизни в кэше
+RECOMMENDATIONS_SIZE = 20
+
+RECOMMENDATIONS_CACHE_TIMEOUT = 60 * 60
+
+# Тренды: число хранимых позиций окна, время жизни в кэше и через
+# сколько часов часовые счётчики сворачиваются в суточные
+TRENDING_SIZE = 100
+
+TRENDING_CACHE_TIMEOUT = 60
+
+TRENDING_HOURLY_HOURS = 48
+
+# Вложенные отзывы в списке произведений: по умолчанию и не больше
+INCLUDED_REVIEWS_DEFAULT = 3
+
+INCLUDED_REVIEWS_MAX = 20
+
+# Лента активности модераторов: записей на странице
+ACTIVITY_FEED_PAGE_SIZE = 20
+
+# Журнал изменений: записей в ответе /changes/ и сколько дней их хранить
+CHANGES_PAGE_SIZE = 500
+
+CHANGES_RETENTION_DAYS = 30
+
+# Записи журнала моложе стольких секунд не отдаются: транзакции записи
+# должны успеть закоммититься за это время
+CHANGES_SAFETY_LAG = 10
+
+# Потоки событий /titles/{id}/events/: бэкенд доставки между процессами,
+# длина очереди клиента и интервал пустых сообщений, секунды
+EVENTS_BACKEND = 'api.events.LocalBackend'
+
+EVENTS_QUEUE_SIZE = 100
+
+EVENTS_KEEPALIVE = 15
+
+# Пакетные запросы /batch/: наибольшее число подзапросов
+BATCH_MAX_REQUESTS = 20
+
+# Выборка списка по ?ids=: наибольшее число значений
+MULTI_GET_MAX_IDS = 100
@@ -0,0 +1,127 @@
+"""Счётчики активности произведений по часам для «трендов».
+
+Каждый новый отзыв увеличивает счётчик своего часа, поэтому рейтинг
+за окно — это сумма нескольких строк на произведение, а не группировка
+всех отзывов. Команда compact_activity сворачивает старые часовые
+интервалы в суточные и удаляет интервалы старше самого длинного окна.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from . import counters
+from .constants import MAX_RATING
+from .models import Review, TitleActivityBucket
+
+WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+}
+
+
+def cache_key(window):
+    return f'trending:{window}'
+
+
+def hour_of(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def add_review(title_id, pub_date, score):
+    """Учесть новый отзыв в счётчике его часа."""
+    counters.increment(
+        TitleActivityBucket,
+        {'title_id': title_id, 'start': hour_of(pub_date)},
+        reviews_count=1, score_sum=score
+    )
+
+
+def change_review(title_id, pub_date, count, score):
+    """Поправить интервал, в который попал отзыв (часовой или суточный)."""
+    bucket = TitleActivityBucket.objects.filter(
+        title_id=title_id, start__lte=pub_date,
+        start__gt=pub_date - timedelta(days=1)
+    ).order_by('-start').values_list('pk', flat=True).first()
+    if bucket is not None:
+        TitleActivityBucket.objects.filter(pk=bucket).update(
+            reviews_count=F('reviews_count') + count,
+            score_sum=F('score_sum') + score
+        )
+
+
+def trending(window, limit):
+    """Первые limit произведений окна: (title_id, отзывов, тренд).
+
+    Тренд — число отзывов, взвешенное оценкой: каждый отзыв даёт
+    score / MAX_RATING. Результат кэшируется на TRENDING_CACHE_TIMEOUT.
+    """
+    key = cache_key(window)
+    entries = cache.get(key)
+    if entries is None:
+        entries = [
+            (title_id, count, total / MAX_RATING)
+            for title_id, count, total in TitleActivityBucket.objects.filter(
+                start__gte=hour_of(timezone.now() - WINDOWS[window])
+            ).values('title_id').annotate(
+                count=Sum('reviews_count'), total=Sum('score_sum')
+            ).filter(count__gt=0).order_by(
+                '-total', '-count', 'title_id'
+            ).values_list(
+                'title_id', 'count', 'total'
+            )[:settings.TRENDING_SIZE]
+        ]
+        cache.set(key, entries, settings.TRENDING_CACHE_TIMEOUT)
+    return entries[:limit]
+
+
+def compact(now=None):
+    """Свернуть интервалы старше TRENDING_HOURLY_HOURS часов в суточные.
+
+    Интервалы старше самого длинного окна удаляются. Возвращает число
+    свёрнутых строк и число получившихся суточных.
+    """
+    now = now or timezone.now()
+    TitleActivityBucket.objects.filter(
+        start__lt=now - max(WINDOWS.values()) - timedelta(days=1)
+    ).delete()
+    old = TitleActivityBucket.objects.filter(start__lt=hour_of(
+        now - timedelta(hours=settings.TRENDING_HOURLY_HOURS)
+    ).replace(hour=0))
+    with transaction.atomic():
+        days = [
+            TitleActivityBucket(title_id=row['title_id'], start=row['day'],
+                                reviews_count=row['count'],
+                                score_sum=row['total'])
+            for row in old.annotate(day=TruncDay('start')).values(
+                'title_id', 'day'
+            ).annotate(count=Sum('reviews_count'), total=Sum('score_sum'))
+        ]
+        before, _ = old.delete()
+        TitleActivityBucket.objects.bulk_create(days, batch_size=1000)
+    return before, len(days)
+
+
+def rebuild():
+    """Пересчитать счётчики за самое длинное окно по отзывам."""
+    since = hour_of(timezone.now() - max(WINDOWS.values()))
+    buckets = [
+        TitleActivityBucket(title_id=row['title_id'], start=row['hour'],
+                            reviews_count=row['count'],
+                            score_sum=row['total'])
+        for row in Review.objects.filter(pub_date__gte=since).annotate(
+            hour=TruncHour('pub_date')
+        ).values('title_id', 'hour').annotate(
+            count=Count('id'), total=Sum('score')
+        ).order_by()
+    ]
+    with transaction.atomic():
+        TitleActivityBucket.objects.all().delete()
+        TitleActivityBucket.objects.bulk_create(buckets, batch_size=1000)
+    cache.delete_many([cache_key(window) for window in WINDOWS])
+    return len(buckets)
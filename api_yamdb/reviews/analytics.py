@@ -0,0 +1,109 @@
+"""Сводная статистика жанров и категорий.
+
+GenreStats и CategoryStats хранят число произведений, отзывов и сумму
+оценок. Новый, изменённый или удалённый отзыв меняет строки жанров и
+категории своего произведения на разницу. Редкие изменения самих
+произведений (категория, жанры, удаление) пересчитывают затронутые
+строки по хранимой статистике Title, а rebuild собирает всё заново
+векторно в NumPy.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from . import counters
+from .models import Category, CategoryStats, Genre, GenreStats, Title
+
+
+def add_review(title_id, count, score):
+    """Учесть отзыв (count=1), его удаление (-1) или смену оценки (0)."""
+    for category_id in Title.objects.filter(pk=title_id).values_list(
+            'category_id', flat=True):
+        if category_id is not None:
+            counters.increment(
+                CategoryStats, {'category_id': category_id},
+                reviews_count=count, score_sum=score
+            )
+    for genre_id in Title.genre.through.objects.filter(
+            title_id=title_id).values_list('genre_id', flat=True):
+        counters.increment(
+            GenreStats, {'genre_id': genre_id},
+            reviews_count=count, score_sum=score
+        )
+
+
+def refresh(model, key, ids, titles):
+    """Пересчитать строки ids по произведениям titles(id)."""
+    for group_id in ids:
+        if group_id is None:
+            continue
+        stats = titles(group_id).aggregate(
+            titles=Count('id'), reviews=Sum('reviews_count'),
+            scores=Sum('score_sum')
+        )
+        model.objects.update_or_create(**{key: group_id}, defaults={
+            'titles_count': stats['titles'],
+            'reviews_count': stats['reviews'] or 0,
+            'score_sum': stats['scores'] or 0,
+        })
+
+
+def refresh_genres(genre_ids):
+    refresh(GenreStats, 'genre_id', genre_ids,
+            lambda genre_id: Title.objects.filter(genre=genre_id))
+
+
+def refresh_categories(category_ids):
+    refresh(CategoryStats, 'category_id', category_ids,
+            lambda category_id: Title.objects.filter(category=category_id))
+
+
+def group_totals(groups, titles, counts, sums, size):
+    """Суммы по группам: groups[i] — группа произведения titles[i]."""
+    return (
+        np.bincount(groups, minlength=size),
+        np.bincount(groups, weights=counts[titles], minlength=size),
+        np.bincount(groups, weights=sums[titles], minlength=size),
+    )
+
+
+def rebuild():
+    """Пересобрать статистику всех жанров и категорий."""
+    title_ids, category_ids, counts, sums = np.array(
+        list(Title.objects.order_by('id').values_list(
+            'id', 'category_id', 'reviews_count', 'score_sum'
+        )), dtype=np.float64
+    ).reshape(-1, 4).T
+    title_ids = title_ids.astype(np.int64)
+    links = np.array(
+        list(Title.genre.through.objects.values_list('title_id', 'genre_id')),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    genres = list(Genre.objects.values_list('id', flat=True))
+    categories = list(Category.objects.values_list('id', flat=True))
+    size = max(genres + categories + [0]) + 1
+    genre_totals = group_totals(
+        links[:, 1], np.searchsorted(title_ids, links[:, 0]),
+        counts, sums, size
+    )
+    with_category = ~np.isnan(category_ids)
+    category_totals = group_totals(
+        category_ids[with_category].astype(np.int64),
+        np.flatnonzero(with_category), counts, sums, size
+    )
+    with transaction.atomic():
+        for model, key, ids, totals in (
+                (GenreStats, 'genre_id', genres, genre_totals),
+                (CategoryStats, 'category_id', categories,
+                 category_totals)):
+            titles, reviews, scores = (
+                column.astype(np.int64).tolist() for column in totals
+            )
+            model.objects.all().delete()
+            model.objects.bulk_create([
+                model(**{key: group_id}, titles_count=titles[group_id],
+                      reviews_count=reviews[group_id],
+                      score_sum=scores[group_id])
+                for group_id in ids
+            ], batch_size=1000)
+    return len(genres), len(categories)
@@ -0,0 +1,107 @@
+"""Журнал изменений для синхронизации каталога сторонними клиентами.
+
+Сигналы записывают ChangeLogEntry после сохранения объекта; запись
+через API идёт в одной транзакции с ним (api.mixins.AtomicWriteMixin).
+Изменения через QuerySet.update не шлют сигналов и отмечаются явно
+(record_titles). Курсор клиента — id последней полученной записи: id растут
+монотонно, поэтому следующая порция — записи с id больше курсора.
+Транзакции коммитятся не в порядке id, поэтому записи моложе
+CHANGES_SAFETY_LAG секунд не отдаются: раньше них ещё может появиться
+запись с меньшим id из незавершённой транзакции.
+compact удаляет записи, перекрытые более поздними по тому же объекту,
+и записи старше CHANGES_RETENTION_DAYS. Вместо удалённых по сроку
+остаётся служебная запись TRUNCATED: клиенту с курсором до неё нужна
+полная повторная загрузка.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .constants import ChangeAction
+from .models import Category, ChangeLogEntry, Comment, Genre, Review, Title
+
+MODELS = {
+    Title: 'title',
+    Genre: 'genre',
+    Category: 'category',
+    Review: 'review',
+    Comment: 'comment',
+}
+
+
+def record(instance, action):
+    ChangeLogEntry.objects.create(
+        model=MODELS[type(instance)], object_id=instance.pk, action=action
+    )
+
+
+def record_titles(titles):
+    """Отметить изменёнными произведения queryset titles."""
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model=MODELS[Title], object_id=title_id,
+                       action=ChangeAction.UPDATED)
+        for title_id in titles.values_list('pk', flat=True)
+    ])
+
+
+def latest_cursor():
+    """Наибольший курсор, перед которым журнал уже не пополнится."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHANGES_SAFETY_LAG)
+    return ChangeLogEntry.objects.filter(created__lte=cutoff).aggregate(
+        cursor=Max('id')
+    )['cursor'] or 0
+
+
+def changed_ids(model, cursor, horizon):
+    """id объектов модели model с записями в журнале в (cursor, horizon]."""
+    return ChangeLogEntry.objects.filter(
+        model=MODELS[model], id__gt=cursor, id__lte=horizon
+    ).order_by().values_list('object_id', flat=True).distinct()
+
+
+def is_truncated(cursor):
+    """Удалены ли по сроку хранения записи после курсора."""
+    return ChangeLogEntry.objects.filter(
+        action=ChangeAction.TRUNCATED, id__gt=cursor
+    ).exists()
+
+
+def since(cursor, limit):
+    """Не больше limit записей после курсора в порядке id."""
+    return [
+        {'cursor': pk, 'model': model, 'id': object_id, 'action': action}
+        for pk, model, object_id, action in ChangeLogEntry.objects.filter(
+            id__gt=cursor, id__lte=latest_cursor()
+        ).exclude(action=ChangeAction.TRUNCATED).order_by('id').values_list(
+            'id', 'model', 'object_id', 'action'
+        )[:limit]
+    ]
+
+
+def compact(now=None):
+    """Удалить перекрытые и устаревшие записи.
+
+    Возвращает число удалённых перекрытых записей и записей по сроку.
+    """
+    now = now or timezone.now()
+    entries = ChangeLogEntry.objects.exclude(action=ChangeAction.TRUNCATED)
+    latest = entries.values('model', 'object_id').annotate(
+        latest=Max('id')
+    ).values('latest')
+    with transaction.atomic():
+        superseded, _ = entries.exclude(id__in=latest).delete()
+        horizon = ChangeLogEntry.objects.filter(created__lt=now - timedelta(
+            days=settings.CHANGES_RETENTION_DAYS
+        )).aggregate(horizon=Max('id'))['horizon']
+        expired = 0
+        if horizon is not None:
+            expired, _ = ChangeLogEntry.objects.filter(
+                id__lt=horizon
+            ).delete()
+            ChangeLogEntry.objects.filter(id=horizon).update(
+                action=ChangeAction.TRUNCATED
+            )
+    return superseded, expired
@@ -9,6 +9,16 @@ class Role(models.TextChoices):
     ADMIN = 'admin', 'admin'
 
 
+class ChangeAction(models.TextChoices):
+    """Действия в журнале изменений."""
+
+    CREATED = 'created', 'created'
+    UPDATED = 'updated', 'updated'
+    DELETED = 'deleted', 'deleted'
+    # Служебная запись: всё до неё удалено по сроку хранения.
+    TRUNCATED = 'truncated', 'truncated'
+
+
 MIN_RATING = 1
 MAX_RATING = 10
 EMAIL_MAX_LENGTH = 254
@@ -16,3 +26,9 @@ USERNAME_MAX_LENGTH = 150
 FIRST_NAME_MAX_LENGTH = 150
 LAST_NAME_MAX_LENGTH = 150
 FORBIDDEN_USERNAMES = ('me',)
+# Жанров с битом в Title.genre_mask (знаковый BigInteger без знакового бита)
+GENRE_MASK_BITS = 63
+# Попыток занять свободный бит при параллельном создании жанров
+GENRE_BIT_ATTEMPTS = 5
+# Наибольший id (BigAutoField): большее число не передать в запрос к БД
+MAX_ID = 2 ** 63 - 1
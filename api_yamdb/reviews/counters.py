@@ -0,0 +1,20 @@
+"""Счётчики в строках предрассчитанных таблиц."""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+def increment(model, lookup, **deltas):
+    """Прибавить deltas к полям строки lookup, создав её при отсутствии.
+
+    UPDATE с F-выражениями не теряет одновременные изменения; если
+    строку одновременно создал другой запрос, UPDATE повторяется.
+    """
+    rows = model.objects.filter(**lookup)
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        rows.update(**changes)
@@ -0,0 +1,72 @@
+"""Битовые маски жанров произведений.
+
+Каждому жанру выдаётся свой бит, а Title.genre_mask хранит объединение
+битов жанров произведения. Пересечения и объединения жанров считаются
+побитовыми операциями над одной колонкой, без соединения с
+reviews_title_genre. Жанры сверх GENRE_MASK_BITS бита не получают.
+"""
+from django.db.models import F
+
+from .constants import GENRE_MASK_BITS
+
+
+def mask_of(bits):
+    mask = 0
+    for bit in bits:
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def genres_mask(genres):
+    """Маска набора жанров и список жанров без бита."""
+    return (
+        mask_of(genre.bit for genre in genres),
+        [genre for genre in genres if genre.bit is None]
+    )
+
+
+def set_bits(titles, mask):
+    if mask:
+        titles.update(genre_mask=F('genre_mask').bitor(mask))
+
+
+def clear_bits(titles, mask):
+    if mask:
+        titles.update(genre_mask=F('genre_mask').bitand(~mask))
+
+
+def with_bits(queryset, mask):
+    """Произведения, в маске которых есть все биты mask."""
+    return queryset.annotate(
+        genre_match=F('genre_mask').bitand(mask)
+    ).filter(genre_match=mask)
+
+
+def with_any_bit(queryset, mask):
+    """Произведения, в маске которых есть хотя бы один бит mask."""
+    return queryset.annotate(
+        genre_match=F('genre_mask').bitand(mask)
+    ).exclude(genre_match=0)
+
+
+def rebuild(genre_model, title_model):
+    """Раздать биты жанрам без бита и пересчитать маски всех произведений."""
+    used = set(genre_model.objects.exclude(bit=None).values_list(
+        'bit', flat=True
+    ))
+    free = (bit for bit in range(GENRE_MASK_BITS) if bit not in used)
+    genres = list(genre_model.objects.filter(bit=None).order_by('id'))
+    for genre, bit in zip(genres, free):
+        genre.bit = bit
+    genre_model.objects.bulk_update(genres, ['bit'])
+
+    bits = dict(genre_model.objects.values_list('id', 'bit'))
+    masks = {}
+    for title_id, genre_id in title_model.genre.through.objects.values_list(
+            'title_id', 'genre_id'):
+        masks[title_id] = masks.get(title_id, 0) | mask_of([bits[genre_id]])
+    titles = list(title_model.objects.only('genre_mask'))
+    for title in titles:
+        title.genre_mask = masks.get(title.id, 0)
+    title_model.objects.bulk_update(titles, ['genre_mask'], batch_size=1000)
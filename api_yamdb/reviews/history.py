@@ -0,0 +1,94 @@
+"""История оценок произведений по дням.
+
+TitleDailyRating хранит число и сумму оценок произведения за день и
+обновляется при каждой записи отзыва, поэтому история читается по
+строке на день, без просмотра отзывов.
+"""
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import counters
+from .models import Review, TitleDailyRating
+
+
+def day_of(pub_date):
+    return timezone.localdate(pub_date)
+
+
+def add_review(title_id, pub_date, score):
+    counters.increment(
+        TitleDailyRating,
+        {'title_id': title_id, 'day': day_of(pub_date)},
+        reviews_count=1, score_sum=score
+    )
+
+
+def change_review(title_id, pub_date, count, score):
+    TitleDailyRating.objects.filter(
+        title_id=title_id, day=day_of(pub_date)
+    ).update(
+        reviews_count=F('reviews_count') + count,
+        score_sum=F('score_sum') + score
+    )
+
+
+def series(title_id, since=None, until=None):
+    """Дни с отзывами: оценки за день и средняя оценка на конец дня."""
+    rows = TitleDailyRating.objects.filter(
+        title_id=title_id, reviews_count__gt=0
+    ).order_by('day')
+    count = total = 0
+    if since is not None:
+        before = rows.filter(day__lt=since).aggregate(
+            count=Sum('reviews_count'), total=Sum('score_sum')
+        )
+        count, total = before['count'] or 0, before['total'] or 0
+        rows = rows.filter(day__gte=since)
+    if until is not None:
+        rows = rows.filter(day__lte=until)
+    history = []
+    for day, day_count, day_total in rows.values_list(
+            'day', 'reviews_count', 'score_sum'):
+        count += day_count
+        total += day_total
+        history.append({
+            'day': day,
+            'reviews_count': day_count,
+            'average': day_total / day_count,
+            'rating': total / count,
+        })
+    return history
+
+
+def backfill(batch_size=2000):
+    """Пересобрать таблицу, читая отзывы потоком в порядке pub_date.
+
+    Суммы копятся только для текущего дня и сбрасываются в БД при
+    переходе к следующему, так что память не зависит от числа отзывов.
+    Возвращает число записанных строк.
+    """
+    written = 0
+    current_day, totals = None, {}
+
+    def flush():
+        TitleDailyRating.objects.bulk_create([
+            TitleDailyRating(title_id=title_id, day=current_day,
+                             reviews_count=count, score_sum=total)
+            for title_id, (count, total) in totals.items()
+        ], batch_size=1000)
+        return len(totals)
+
+    with transaction.atomic():
+        TitleDailyRating.objects.all().delete()
+        for title_id, pub_date, score in Review.objects.order_by(
+                'pub_date').values_list(
+                'title_id', 'pub_date', 'score').iterator(batch_size):
+            day = day_of(pub_date)
+            if day != current_day:
+                written += flush()
+                current_day, totals = day, {}
+            count, total = totals.get(title_id, (0, 0))
+            totals[title_id] = (count + 1, total + score)
+        written += flush()
+    return written
@@ -0,0 +1,148 @@
+"""Предрассчитанный рейтинг лучших произведений.
+
+Оценка произведения — байесовское среднее: (C * m + сумма оценок) /
+(C + число отзывов), где m — априорная средняя оценка, а C — вес
+априорного мнения в «голосах». Так произведения с парой отзывов не
+обгоняют проверенные временем. Рейтинг хранится отдельно для всех
+произведений, для каждого жанра и каждой категории.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import LeaderboardEntry, Title
+
+ALL = 'all'
+VERSION_KEY = 'leaderboard:version'
+
+
+def genre_partition(genre_id):
+    return f'genre:{genre_id}'
+
+
+def category_partition(category_id):
+    return f'category:{category_id}'
+
+
+def cache_version():
+    """Общая версия кэша рейтинга; смена версии сбрасывает все разделы."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def cache_key(partition, version=None):
+    return f'leaderboard:{version or cache_version()}:{partition}'
+
+
+def invalidate(partitions):
+    version = cache_version()
+    cache.delete_many(
+        [cache_key(partition, version) for partition in partitions]
+    )
+
+
+def bayesian_rating(count, total):
+    prior_votes = settings.LEADERBOARD_PRIOR_VOTES
+    return (
+        (prior_votes * settings.LEADERBOARD_PRIOR_MEAN + total)
+        / (prior_votes + count)
+    )
+
+
+def title_partitions(category_id, genre_ids):
+    partitions = [ALL, *(genre_partition(id) for id in genre_ids)]
+    if category_id is not None:
+        partitions.append(category_partition(category_id))
+    return partitions
+
+
+def refresh_title(title_id):
+    """Пересчитать позиции произведения после записи отзыва или правки."""
+    old_partitions = set(LeaderboardEntry.objects.filter(
+        title_id=title_id
+    ).values_list('partition', flat=True))
+    title = Title.objects.filter(pk=title_id).only(
+        'category_id', 'reviews_count', 'score_sum'
+    ).first()
+    partitions = []
+    if title is not None and title.reviews_count:
+        score = bayesian_rating(title.reviews_count, title.score_sum)
+        partitions = title_partitions(
+            title.category_id,
+            title.genre.values_list('id', flat=True)
+        )
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(title_id=title_id).exclude(
+            partition__in=partitions
+        ).delete()
+        if partitions:
+            LeaderboardEntry.objects.filter(
+                title_id=title_id, partition__in=partitions
+            ).update(score=score)
+            LeaderboardEntry.objects.bulk_create(
+                [LeaderboardEntry(partition=partition, title_id=title_id,
+                                  score=score)
+                 for partition in partitions
+                 if partition not in old_partitions],
+                ignore_conflicts=True
+            )
+    invalidate(old_partitions | set(partitions))
+
+
+def drop_partition(partition):
+    LeaderboardEntry.objects.filter(partition=partition).delete()
+    invalidate([partition])
+
+
+def invalidate_all():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def rebuild():
+    """Полностью пересобрать рейтинг по хранимой статистике произведений."""
+    stats = Title.objects.filter(reviews_count__gt=0).values_list(
+        'id', 'category_id', 'reviews_count', 'score_sum'
+    )
+    genres = {}
+    for title_id, genre_id in Title.genre.through.objects.values_list(
+            'title_id', 'genre_id'):
+        genres.setdefault(title_id, []).append(genre_id)
+    entries = []
+    for title_id, category_id, count, total in stats:
+        score = bayesian_rating(count, total)
+        entries.extend(
+            LeaderboardEntry(partition=partition, title_id=title_id,
+                             score=score)
+            for partition in title_partitions(
+                category_id, genres.get(title_id, ())
+            )
+        )
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+    invalidate_all()
+    return len(entries)
+
+
+def top(partition, limit, load):
+    """Первые limit позиций раздела.
+
+    Страница из LEADERBOARD_SIZE позиций строится функцией load по
+    списку (title_id, score) и хранится в кэше до следующей записи, но
+    не дольше LEADERBOARD_CACHE_TIMEOUT секунд.
+    """
+    key = cache_key(partition)
+    data = cache.get(key)
+    if data is None:
+        data = load(list(LeaderboardEntry.objects.filter(
+            partition=partition
+        ).order_by('-score', 'title_id').values_list(
+            'title_id', 'score'
+        )[:settings.LEADERBOARD_SIZE]))
+        cache.set(key, data, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return data[:limit]
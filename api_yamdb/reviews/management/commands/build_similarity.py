@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews import similarity
+from reviews.models import Review, Title
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать похожие произведения для произведений, у которых '
+        'изменились отзывы или жанры (с --full — для всех).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true')
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        built = similarity.build(options['full'], options['chunk_size'])
+        self.stdout.write(
+            f'Похожие пересчитаны для {built} произведений за '
+            f'{time.perf_counter() - started:.2f} с (всего произведений: '
+            f'{Title.objects.count()}, отзывов: {Review.objects.count()}).'
+        )
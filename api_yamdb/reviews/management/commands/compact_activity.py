@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from reviews import activity
+
+
+class Command(BaseCommand):
+    help = (
+        'Свернуть старые часовые счётчики активности в суточные и удалить '
+        'счётчики старше самого длинного окна трендов. Запускайте '
+        'периодически, например раз в час.'
+    )
+
+    def handle(self, *args, **options):
+        compacted, days = activity.compact()
+        self.stdout.write(
+            f'Свёрнуто интервалов: {compacted}, суточных: {days}.'
+        )
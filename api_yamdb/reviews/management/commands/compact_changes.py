@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reviews import changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Удалить из журнала изменений записи, перекрытые более поздними, '
+        'и записи старше CHANGES_RETENTION_DAYS дней. Запускайте '
+        'периодически, например раз в сутки.'
+    )
+
+    def handle(self, *args, **options):
+        superseded, expired = changes.compact()
+        self.stdout.write(
+            f'Удалено перекрытых записей: {superseded}, '
+            f'устаревших: {expired}.'
+        )
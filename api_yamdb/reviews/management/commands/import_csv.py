@@ -2,6 +2,7 @@ import csv
 import sqlite3
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
 from reviews.models import Category, Genre, Title, Review, Comment
@@ -74,3 +75,4 @@ class Command(BaseCommand):
                 populate_table(reader, name, fields)
             else:
                 populate_model(reader, name, fields)
+        call_command('rebuild_stats')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from reviews import (activity, analytics, genre_masks, history, leaderboard,
+                     ratings)
+from reviews.models import Genre, Review, Title, normalize_name
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать предрассчитанные рейтинги и статистику.'
+
+    def handle(self, *args, **options):
+        titles = list(Title.objects.filter(name_normalized='').only('name'))
+        for title in titles:
+            title.name_normalized = normalize_name(title.name)
+        Title.objects.bulk_update(titles, ['name_normalized'], batch_size=1000)
+        genre_masks.rebuild(Genre, Title)
+        self.stdout.write('Маски жанров пересчитаны.')
+        ratings.rebuild(Title, Review)
+        self.stdout.write('Средние оценки произведений пересчитаны.')
+        entries = leaderboard.rebuild()
+        self.stdout.write(f'Рейтинг произведений: {entries} позиций.')
+        buckets = activity.rebuild()
+        self.stdout.write(f'Счётчики активности: {buckets} интервалов.')
+        days = history.backfill()
+        self.stdout.write(f'История оценок: {days} строк.')
+        genres, categories = analytics.rebuild()
+        self.stdout.write(
+            f'Статистика: {genres} жанров, {categories} категорий.'
+        )
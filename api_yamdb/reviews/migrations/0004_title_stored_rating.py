@@ -0,0 +1,74 @@
+# Generated by Django 3.2 on 2026-10-19 09:26
+
+from django.db import migrations, models
+from django.db.models import (
+    Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+)
+from django.db.models.functions import Cast, Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+
+    def review_stats(aggregate):
+        return Coalesce(Subquery(
+            Review.objects.filter(title=OuterRef('pk')).order_by().values(
+                'title'
+            ).annotate(value=aggregate).values('value'),
+            output_field=IntegerField()
+        ), Value(0))
+
+    Title.objects.update(
+        reviews_count=review_stats(Count('id')),
+        score_sum=review_stats(Sum('score')),
+    )
+    Title.objects.filter(reviews_count__gt=0).update(
+        rating=Cast('score_sum', FloatField()) / F('reviews_count')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(editable=False, null=True, verbose_name='Средняя оценка'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name'], name='title_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year'], name='title_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-rating'], name='title_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-reviews_count'], name='title_reviews_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-rating'], name='title_category_rating_idx'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
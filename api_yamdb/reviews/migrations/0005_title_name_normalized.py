@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+def normalize_name(value):
+    # Копия reviews.models.normalize_name на момент миграции.
+    return ' '.join(value.casefold().replace('ё', 'е').split())
+
+
+def fill_normalized_names(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    titles = list(Title.objects.only('name'))
+    for title in titles:
+        title.name_normalized = normalize_name(title.name)
+    Title.objects.bulk_update(titles, ['name_normalized'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_title_stored_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='name_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='Название для поиска'),
+        ),
+        migrations.RunPython(fill_normalized_names,
+                             migrations.RunPython.noop),
+    ]
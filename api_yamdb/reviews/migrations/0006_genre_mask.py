@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+# Копия reviews.constants.GENRE_MASK_BITS на момент миграции.
+GENRE_MASK_BITS = 63
+
+
+def fill_genre_masks(apps, schema_editor):
+    # Копия reviews.genre_masks.rebuild на момент миграции.
+    Genre = apps.get_model('reviews', 'Genre')
+    Title = apps.get_model('reviews', 'Title')
+    genres = list(Genre.objects.order_by('id'))
+    for genre, bit in zip(genres, range(GENRE_MASK_BITS)):
+        genre.bit = bit
+    Genre.objects.bulk_update(genres, ['bit'])
+
+    bits = {genre.id: genre.bit for genre in genres}
+    masks = {}
+    for title_id, genre_id in Title.genre.through.objects.values_list(
+            'title_id', 'genre_id'):
+        if bits[genre_id] is not None:
+            masks[title_id] = masks.get(title_id, 0) | 1 << bits[genre_id]
+    titles = list(Title.objects.only('genre_mask'))
+    for title in titles:
+        title.genre_mask = masks.get(title.id, 0)
+    Title.objects.bulk_update(titles, ['genre_mask'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_name_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genre',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True, verbose_name='Бит в маске жанров'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='genre_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска жанров'),
+        ),
+        migrations.RunPython(fill_genre_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-19 09:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_similar_titles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(verbose_name='Начало интервала')),
+                ('reviews_count', models.IntegerField(default=0, verbose_name='Число отзывов')),
+                ('score_sum', models.IntegerField(default=0, verbose_name='Сумма оценок')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_buckets', to='reviews.title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Активность за интервал',
+                'verbose_name_plural': 'Активность произведений',
+                'default_related_name': 'activity_buckets',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titleactivitybucket',
+            index=models.Index(fields=['start'], name='activity_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titleactivitybucket',
+            constraint=models.UniqueConstraint(fields=('title', 'start'), name='unique_activity_bucket'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-19 09:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_activity_bucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleDailyRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('reviews_count', models.IntegerField(default=0, verbose_name='Число отзывов')),
+                ('score_sum', models.IntegerField(default=0, verbose_name='Сумма оценок')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_ratings', to='reviews.title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Оценки за день',
+                'verbose_name_plural': 'Оценки произведений по дням',
+                'default_related_name': 'daily_ratings',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='titledailyrating',
+            constraint=models.UniqueConstraint(fields=('title', 'day'), name='unique_daily_rating'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2 on 2026-10-19 09:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_title_daily_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('titles_count', models.IntegerField(default=0, verbose_name='Число произведений')),
+                ('reviews_count', models.IntegerField(default=0, verbose_name='Число отзывов')),
+                ('score_sum', models.IntegerField(default=0, verbose_name='Сумма оценок')),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Статистика категории',
+                'verbose_name_plural': 'Статистика категорий',
+            },
+        ),
+        migrations.CreateModel(
+            name='GenreStats',
+            fields=[
+                ('titles_count', models.IntegerField(default=0, verbose_name='Число произведений')),
+                ('reviews_count', models.IntegerField(default=0, verbose_name='Число отзывов')),
+                ('score_sum', models.IntegerField(default=0, verbose_name='Сумма оценок')),
+                ('genre', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.genre', verbose_name='Жанр')),
+            ],
+            options={
+                'verbose_name': 'Статистика жанра',
+                'verbose_name_plural': 'Статистика жанров',
+            },
+        ),
+    ]
@@ -5,11 +5,12 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import (
     MinValueValidator, MaxValueValidator, EmailValidator
 )
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
 from .constants import (
-    Role, USERNAME_MAX_LENGTH, MIN_RATING, MAX_RATING,
-    FIRST_NAME_MAX_LENGTH, LAST_NAME_MAX_LENGTH
+    ChangeAction, Role, USERNAME_MAX_LENGTH, MIN_RATING, MAX_RATING,
+    FIRST_NAME_MAX_LENGTH, LAST_NAME_MAX_LENGTH, GENRE_MASK_BITS,
+    GENRE_BIT_ATTEMPTS
 )
 from .validators import forbidden_usernames
 
@@ -93,18 +94,53 @@ class Category(Classification):
 
 
 class Genre(Classification):
+    bit = models.PositiveSmallIntegerField(
+        'Бит в маске жанров', null=True, unique=True, editable=False)
 
     class Meta(Classification.Meta):
         verbose_name = 'Жанр'
         verbose_name_plural = 'Жанры'
 
+    def save(self, *args, **kwargs):
+        if self.bit is not None:
+            return super().save(*args, **kwargs)
+        # Параллельно созданный жанр мог занять тот же бит: тогда
+        # уникальность bit не даст сохранить, и берётся следующий.
+        for _ in range(GENRE_BIT_ATTEMPTS):
+            self.bit = free_genre_bit()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if self.bit is None or not Genre.objects.filter(
+                        bit=self.bit).exclude(pk=self.pk).exists():
+                    raise
+        self.bit = None
+        return super().save(*args, **kwargs)
+
+
+def free_genre_bit():
+    """Свободный бит маски жанров или None, если все биты заняты."""
+    used = set(Genre.objects.exclude(bit=None).values_list('bit', flat=True))
+    return next(
+        (bit for bit in range(GENRE_MASK_BITS) if bit not in used), None
+    )
+
 
 def current_year():
     return date.today().year
 
 
+def normalize_name(value):
+    """Название для поиска: без учёта регистра, «ё» равна «е»."""
+    return ' '.join(value.casefold().replace('ё', 'е').split())
+
+
 class Title(models.Model):
     name = models.CharField('Название', max_length=256)
+    name_normalized = models.CharField(
+        'Название для поиска', max_length=256, db_index=True,
+        default='', editable=False)
     year = models.IntegerField(
         'Год создания',
         validators=[MaxValueValidator(current_year), ]
@@ -118,12 +154,38 @@ class Title(models.Model):
         verbose_name='Категория'
     )
     genre = models.ManyToManyField(Genre, verbose_name='Жанр')
+    genre_mask = models.BigIntegerField(
+        'Маска жанров', default=0, editable=False)
+    rating = models.FloatField('Средняя оценка', null=True, editable=False)
+    reviews_count = models.PositiveIntegerField(
+        'Число отзывов', default=0, editable=False)
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок', default=0, editable=False)
+    similar_stale = models.BooleanField(
+        'Похожие произведения устарели', default=True, db_index=True,
+        editable=False)
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         default_related_name = 'titles'
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=['name'], name='title_name_idx'),
+            models.Index(fields=['year'], name='title_year_idx'),
+            models.Index(fields=['-rating'], name='title_rating_idx'),
+            models.Index(fields=['-reviews_count'],
+                         name='title_reviews_count_idx'),
+            models.Index(fields=['category', '-rating'],
+                         name='title_category_rating_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.name_normalized = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_normalized'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return (
@@ -196,3 +258,182 @@ class Comment(Post):
             f'{super().__str__()}, '
             f'{self.review=:.20}'
         )
+
+
+class LeaderboardEntry(models.Model):
+    partition = models.CharField('Раздел рейтинга', max_length=64)
+    title = models.ForeignKey(Title, on_delete=models.CASCADE,
+                              verbose_name='Произведение')
+    score = models.FloatField('Взвешенный рейтинг')
+
+    class Meta:
+        verbose_name = 'Позиция в рейтинге'
+        verbose_name_plural = 'Рейтинг произведений'
+        default_related_name = 'leaderboard_entries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['partition', 'title'], name='unique_leaderboard_entry'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['partition', '-score'],
+                         name='leaderboard_top_idx')
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.partition=}, '
+            f'{self.title_id=}, '
+            f'{self.score=}'
+        )
+
+
+class SimilarTitle(models.Model):
+    title = models.ForeignKey(Title, on_delete=models.CASCADE,
+                              related_name='similar_entries',
+                              verbose_name='Произведение')
+    similar = models.ForeignKey(Title, on_delete=models.CASCADE,
+                                related_name='+',
+                                verbose_name='Похожее произведение')
+    score = models.FloatField('Похожесть')
+
+    class Meta:
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'similar'], name='unique_similar_title'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['title', '-score'],
+                         name='similar_title_top_idx')
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.title_id=}, '
+            f'{self.similar_id=}, '
+            f'{self.score=}'
+        )
+
+
+class TitleActivityBucket(models.Model):
+    title = models.ForeignKey(Title, on_delete=models.CASCADE,
+                              verbose_name='Произведение')
+    start = models.DateTimeField('Начало интервала')
+    reviews_count = models.IntegerField('Число отзывов', default=0)
+    score_sum = models.IntegerField('Сумма оценок', default=0)
+
+    class Meta:
+        verbose_name = 'Активность за интервал'
+        verbose_name_plural = 'Активность произведений'
+        default_related_name = 'activity_buckets'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'start'], name='unique_activity_bucket'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['start'], name='activity_start_idx')
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.title_id=}, '
+            f'{self.start=}, '
+            f'{self.reviews_count=}'
+        )
+
+
+class TitleDailyRating(models.Model):
+    title = models.ForeignKey(Title, on_delete=models.CASCADE,
+                              verbose_name='Произведение')
+    day = models.DateField('День')
+    reviews_count = models.IntegerField('Число отзывов', default=0)
+    score_sum = models.IntegerField('Сумма оценок', default=0)
+
+    class Meta:
+        verbose_name = 'Оценки за день'
+        verbose_name_plural = 'Оценки произведений по дням'
+        default_related_name = 'daily_ratings'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'day'], name='unique_daily_rating'
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.title_id=}, '
+            f'{self.day=}, '
+            f'{self.reviews_count=}'
+        )
+
+
+class ClassificationStats(models.Model):
+    titles_count = models.IntegerField('Число произведений', default=0)
+    reviews_count = models.IntegerField('Число отзывов', default=0)
+    score_sum = models.IntegerField('Сумма оценок', default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_score(self):
+        if not self.reviews_count:
+            return None
+        return self.score_sum / self.reviews_count
+
+
+class GenreStats(ClassificationStats):
+    genre = models.OneToOneField(Genre, on_delete=models.CASCADE,
+                                 primary_key=True, related_name='stats',
+                                 verbose_name='Жанр')
+
+    class Meta:
+        verbose_name = 'Статистика жанра'
+        verbose_name_plural = 'Статистика жанров'
+
+    def __str__(self):
+        return f'{self.genre_id=}, {self.reviews_count=}'
+
+
+class CategoryStats(ClassificationStats):
+    category = models.OneToOneField(Category, on_delete=models.CASCADE,
+                                    primary_key=True, related_name='stats',
+                                    verbose_name='Категория')
+
+    class Meta:
+        verbose_name = 'Статистика категории'
+        verbose_name_plural = 'Статистика категорий'
+
+    def __str__(self):
+        return f'{self.category_id=}, {self.reviews_count=}'
+
+
+class ChangeLogEntry(models.Model):
+    model = models.CharField('Модель', max_length=16)
+    object_id = models.PositiveIntegerField('Идентификатор объекта')
+    action = models.CharField(
+        'Действие',
+        max_length=max(len(action[0]) for action in ChangeAction.choices),
+        choices=ChangeAction.choices
+    )
+    created = models.DateTimeField('Время изменения', auto_now_add=True,
+                                   db_index=True)
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(fields=['model', 'object_id'],
+                         name='change_log_object_idx')
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.model=}, '
+            f'{self.object_id=}, '
+            f'{self.action=}'
+        )
@@ -0,0 +1,50 @@
+"""Хранимые в Title средняя оценка, число отзывов и сумма оценок.
+
+Колонки индексированы, поэтому сортировка и фильтрация по рейтингу
+не требуют агрегировать отзывы при каждом запросе.
+"""
+from django.db.models import (
+    Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from . import changes
+from .models import Review, Title
+
+
+def review_stats_subquery(review_model, aggregate):
+    return Coalesce(Subquery(
+        review_model.objects.filter(title=OuterRef('pk')).order_by().values(
+            'title'
+        ).annotate(value=aggregate).values('value'),
+        output_field=IntegerField()
+    ), Value(0))
+
+
+def rebuild(title_model, review_model):
+    """Пересчитать колонки для всех произведений двумя UPDATE."""
+    title_model.objects.update(
+        reviews_count=review_stats_subquery(review_model, Count('id')),
+        score_sum=review_stats_subquery(review_model, Sum('score')),
+    )
+    title_model.objects.filter(reviews_count=0).update(rating=None)
+    title_model.objects.filter(reviews_count__gt=0).update(
+        rating=Cast('score_sum', FloatField()) / F('reviews_count')
+    )
+
+
+def refresh_title(title_id):
+    """Пересчитать колонки одного произведения по его отзывам.
+
+    Один UPDATE с подзапросами: агрегат и запись не разделены, и
+    параллельная запись отзыва не оставит устаревший результат. UPDATE
+    не шлёт сигналов, поэтому изменение отмечается в журнале явно.
+    """
+    reviews_count = review_stats_subquery(Review, Count('id'))
+    score_sum = review_stats_subquery(Review, Sum('score'))
+    Title.objects.filter(pk=title_id).update(
+        reviews_count=reviews_count,
+        score_sum=score_sum,
+        rating=Cast(score_sum, FloatField()) / NullIf(reviews_count, 0),
+    )
+    changes.record_titles(Title.objects.filter(pk=title_id))
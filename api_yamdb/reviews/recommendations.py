@@ -0,0 +1,74 @@
+"""Рекомендации произведений пользователю.
+
+Коллаборативная фильтрация по похожим произведениям: модель — таблица
+SimilarTitle, которую заранее строит build_similarity. Прогноз оценки
+произведения — средняя оценка пользователя плюс взвешенное похожестью
+среднее отклонений его оценок похожих произведений. Результат хранится
+в кэше до нового отзыва пользователя.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Review, SimilarTitle, Title
+
+
+def cache_key(user_id):
+    return f'recommendations:{user_id}'
+
+
+def invalidate(user_id):
+    cache.delete(cache_key(user_id))
+
+
+def predict(user_id):
+    """Список (title_id, прогноз оценки) от лучшего прогноза."""
+    user_reviews = Review.objects.filter(author_id=user_id)
+    reviewed, scores = np.array(
+        list(user_reviews.values_list('title_id', 'score')), dtype=np.int64
+    ).reshape(-1, 2).T
+    sources, targets, similarities = np.array(
+        list(SimilarTitle.objects.filter(
+            title_id__in=user_reviews.values('title_id')
+        ).exclude(
+            similar_id__in=user_reviews.values('title_id')
+        ).values_list('title_id', 'similar_id', 'score')),
+        dtype=np.float64
+    ).reshape(-1, 3).T
+    if not len(targets):
+        return []
+    mean = scores.mean()
+    order = np.argsort(reviewed)
+    deviations = (scores - mean)[order][np.searchsorted(
+        reviewed[order], sources.astype(np.int64)
+    )]
+    titles, inverse = np.unique(targets.astype(np.int64), return_inverse=True)
+    support = np.bincount(inverse, weights=similarities)
+    predicted = mean + np.bincount(
+        inverse, weights=similarities * deviations
+    ) / support
+    # При равном прогнозе выше те, что похожи на большее число прочитанных.
+    order = np.lexsort((titles, -support, -predicted))
+    return list(zip(titles[order].tolist(), predicted[order].tolist()))
+
+
+def fallback(user_id, limit):
+    """Лучшие по рейтингу непрочитанные произведения, если прогноза нет."""
+    return [
+        (title_id, rating) for title_id, rating in Title.objects.exclude(
+            reviews__author_id=user_id
+        ).filter(rating__isnull=False).order_by('-rating', 'id').values_list(
+            'id', 'rating'
+        )[:limit]
+    ]
+
+
+def recommend(user_id):
+    """Рекомендации пользователя (до RECOMMENDATIONS_SIZE) из кэша."""
+    key = cache_key(user_id)
+    entries = cache.get(key)
+    if entries is None:
+        limit = settings.RECOMMENDATIONS_SIZE
+        entries = predict(user_id)[:limit] or fallback(user_id, limit)
+        cache.set(key, entries, settings.RECOMMENDATIONS_CACHE_TIMEOUT)
+    return entries
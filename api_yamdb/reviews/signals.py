@@ -0,0 +1,225 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (activity, analytics, changes, genre_masks, history,
+               leaderboard, ratings, recommendations, similarity)
+from .constants import ChangeAction
+from .models import Category, Comment, Genre, Review, Title
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    ratings.refresh_title(instance.title_id)
+    leaderboard.refresh_title(instance.title_id)
+    similarity.mark_stale([instance.title_id])
+    recommendations.invalidate(instance.author_id)
+
+
+@receiver(pre_save, sender=Review)
+def review_score_before_save(sender, instance, **kwargs):
+    instance.previous_score = None
+    if instance.pk is not None:
+        instance.previous_score = Review.objects.filter(
+            pk=instance.pk
+        ).values_list('score', flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def review_counters_saved(sender, instance, created, **kwargs):
+    if created:
+        activity.add_review(
+            instance.title_id, instance.pub_date, instance.score
+        )
+        history.add_review(
+            instance.title_id, instance.pub_date, instance.score
+        )
+        analytics.add_review(instance.title_id, 1, instance.score)
+    elif instance.previous_score not in (None, instance.score):
+        delta = instance.score - instance.previous_score
+        activity.change_review(
+            instance.title_id, instance.pub_date, 0, delta
+        )
+        history.change_review(instance.title_id, instance.pub_date, 0, delta)
+        analytics.add_review(instance.title_id, 0, delta)
+
+
+@receiver(post_delete, sender=Review)
+def review_counters_deleted(sender, instance, **kwargs):
+    activity.change_review(
+        instance.title_id, instance.pub_date, -1, -instance.score
+    )
+    history.change_review(
+        instance.title_id, instance.pub_date, -1, -instance.score
+    )
+    analytics.add_review(instance.title_id, -1, -instance.score)
+
+
+@receiver(post_save, sender=Title)
+def title_changed(sender, instance, **kwargs):
+    leaderboard.refresh_title(instance.pk)
+
+
+@receiver(pre_save, sender=Title)
+def title_category_before_save(sender, instance, **kwargs):
+    instance.previous_category_id = None
+    if instance.pk is not None:
+        instance.previous_category_id = Title.objects.filter(
+            pk=instance.pk
+        ).values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Title)
+def title_analytics_changed(sender, instance, created, **kwargs):
+    if created or instance.previous_category_id != instance.category_id:
+        analytics.refresh_categories(
+            {instance.previous_category_id, instance.category_id}
+        )
+
+
+@receiver(pre_delete, sender=Title)
+def title_genres_before_delete(sender, instance, **kwargs):
+    # Связи с жанрами удаляются раньше, чем придёт post_delete.
+    instance.deleted_genre_ids = list(instance.genre.values_list(
+        'id', flat=True
+    ))
+
+
+@receiver(post_delete, sender=Title)
+def title_analytics_deleted(sender, instance, **kwargs):
+    analytics.refresh_genres(instance.deleted_genre_ids)
+    analytics.refresh_categories([instance.category_id])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_analytics_changed(sender, instance, action, reverse,
+                                   pk_set, **kwargs):
+    if action == 'pre_clear' and not reverse:
+        instance.cleared_genre_ids = list(instance.genre.values_list(
+            'id', flat=True
+        ))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        analytics.refresh_genres([instance.pk])
+    elif action == 'post_clear':
+        analytics.refresh_genres(instance.cleared_genre_ids)
+    else:
+        analytics.refresh_genres(pk_set)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        leaderboard.refresh_title(instance.pk)
+    elif action == 'post_clear':
+        leaderboard.drop_partition(leaderboard.genre_partition(instance.pk))
+    else:
+        for title_id in pk_set:
+            leaderboard.refresh_title(title_id)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genre_masks_changed(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        titles = Title.objects.filter(pk=instance.pk)
+        if action == 'post_clear':
+            titles.update(genre_mask=0)
+            return
+        mask = genre_masks.mask_of(Genre.objects.filter(
+            pk__in=pk_set
+        ).values_list('bit', flat=True))
+    else:
+        mask = genre_masks.mask_of([instance.bit])
+        if action == 'post_clear':
+            titles = genre_masks.with_any_bit(Title.objects.all(), mask)
+        else:
+            titles = Title.objects.filter(pk__in=pk_set)
+    if action == 'post_add':
+        genre_masks.set_bits(titles, mask)
+    else:
+        genre_masks.clear_bits(titles, mask)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_similarity_changed(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        similarity.mark_stale([instance.pk])
+    elif pk_set:
+        similarity.mark_stale(pk_set)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def classification_changed(sender, instance, created, **kwargs):
+    if not created:
+        leaderboard.invalidate_all()
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    leaderboard.drop_partition(leaderboard.category_partition(instance.pk))
+    # Категория есть в закэшированных страницах всех разделов.
+    leaderboard.invalidate_all()
+
+
+@receiver(post_delete, sender=Genre)
+def genre_deleted(sender, instance, **kwargs):
+    leaderboard.drop_partition(leaderboard.genre_partition(instance.pk))
+    mask = genre_masks.mask_of([instance.bit])
+    genre_masks.clear_bits(
+        genre_masks.with_any_bit(Title.objects.all(), mask), mask
+    )
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def change_saved(sender, instance, created, **kwargs):
+    changes.record(
+        instance, ChangeAction.CREATED if created else ChangeAction.UPDATED
+    )
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def change_deleted(sender, instance, **kwargs):
+    changes.record(instance, ChangeAction.DELETED)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_change_logged(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if action == 'pre_clear' and reverse:
+        # После clear список произведений жанра уже неизвестен.
+        changes.record_titles(Title.objects.filter(genre=instance))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        changes.record(instance, ChangeAction.UPDATED)
+    elif pk_set:
+        changes.record_titles(Title.objects.filter(pk__in=pk_set))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def classification_titles_change_logged(sender, instance, **kwargs):
+    # Связи произведений удаляются без сигналов Title.
+    lookup = 'category' if sender is Category else 'genre'
+    changes.record_titles(Title.objects.filter(**{lookup: instance}))
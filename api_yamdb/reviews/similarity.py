@@ -0,0 +1,173 @@
+"""Похожие произведения, рассчитанные заранее.
+
+Похожесть двух произведений — взвешенная сумма двух частей:
+косинусной близости оценок (оценки каждого пользователя центрируются
+по его средней) и доли общих жанров по маскам genre_mask. Матрицы
+произведение × автор и произведение × жанр разреженные, а
+произведения обрабатываются порциями, поэтому память ограничена
+размером порции, а не квадратом числа произведений.
+
+Вместе с устаревшими произведениями пересчитываются и те, у кого они
+были среди похожих: иначе их оценки похожести остались бы прежними.
+"""
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from . import changes
+from .constants import GENRE_MASK_BITS, MAX_ID
+from .models import Review, SimilarTitle, Title
+
+REVIEWS_BATCH_SIZE = 10_000
+
+
+def mark_stale(title_ids):
+    Title.objects.filter(pk__in=title_ids).update(similar_stale=True)
+
+
+def review_rows():
+    """Массив (автор, произведение, оценка) всех отзывов.
+
+    Отзывы читаются курсором порциями прямо в заранее выделенный массив,
+    без списка кортежей на всю таблицу.
+    """
+    reviews = Review.objects.values_list('author_id', 'title_id', 'score')
+    rows = np.zeros((reviews.count(), 3), dtype=np.int64)
+    size = 0
+    iterator = reviews.iterator(chunk_size=REVIEWS_BATCH_SIZE)
+    while True:
+        batch = list(islice(iterator, REVIEWS_BATCH_SIZE))
+        if not batch:
+            break
+        if size + len(batch) > len(rows):
+            # Отзывы, добавленные после подсчёта.
+            rows = np.concatenate([rows, np.zeros(
+                (size + len(batch) - len(rows), 3), dtype=np.int64
+            )])
+        rows[size:size + len(batch)] = batch
+        size += len(batch)
+    return rows[:size]
+
+
+def reviews_matrix(title_ids):
+    """Нормированные строки центрированных оценок: произведение × автор.
+
+    Отзывы произведений, которых нет в title_ids (созданных после их
+    чтения), пропускаются.
+    """
+    authors, titles, scores = review_rows().T
+    known = np.isin(titles, title_ids)
+    authors, titles, scores = authors[known], titles[known], scores[known]
+    _, columns = np.unique(authors, return_inverse=True)
+    counts = np.bincount(columns)
+    means = np.bincount(columns, weights=scores) / np.maximum(counts, 1)
+    matrix = sparse.csr_matrix(
+        (scores - means[columns], (np.searchsorted(title_ids, titles),
+                                   columns)),
+        shape=(len(title_ids), len(counts))
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(matrix.multiply(1 / norms))
+
+
+def genres_matrix(masks):
+    """Бинарная матрица произведение × бит жанра."""
+    rows, columns = [], []
+    for bit in range(GENRE_MASK_BITS):
+        titles = np.flatnonzero((masks >> bit) & 1)
+        rows.append(titles)
+        columns.append(np.full(len(titles), bit))
+    rows, columns = np.concatenate(rows), np.concatenate(columns)
+    return sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, columns)),
+        shape=(len(masks), GENRE_MASK_BITS)
+    )
+
+
+def chunk_similarities(chunk, reviews, genres, genre_sizes):
+    """Похожесть произведений порции chunk на все произведения."""
+    scores = (reviews[chunk] @ reviews.T).tocoo()
+    shared = (genres[chunk] @ genres.T).tocoo()
+    jaccard = shared.data / (
+        genre_sizes[chunk][shared.row] + genre_sizes[shared.col]
+        - shared.data
+    )
+    return (
+        settings.SIMILAR_REVIEWS_WEIGHT * sparse.csr_matrix(
+            (scores.data, (scores.row, scores.col)), shape=scores.shape
+        )
+        + settings.SIMILAR_GENRES_WEIGHT * sparse.csr_matrix(
+            (jaccard, (shared.row, shared.col)), shape=shared.shape
+        )
+    ).tocoo()
+
+
+def top_entries(chunk, similarities, title_ids, size):
+    """Первые size похожих для каждой строки порции, без самого себя."""
+    rows, columns, scores = (
+        similarities.row, similarities.col, similarities.data
+    )
+    keep = (scores > 0) & (chunk[rows] != columns)
+    rows, columns, scores = rows[keep], columns[keep], scores[keep]
+    order = np.lexsort((columns, -scores, rows))
+    rows, columns, scores = rows[order], columns[order], scores[order]
+    starts = np.searchsorted(rows, rows)
+    keep = np.arange(len(rows)) - starts < size
+    return [
+        SimilarTitle(title_id=title_id, similar_id=similar_id, score=score)
+        for title_id, similar_id, score in zip(
+            title_ids[chunk[rows[keep]]].tolist(),
+            title_ids[columns[keep]].tolist(), scores[keep].tolist()
+        )
+    ]
+
+
+def build(full=False, chunk_size=None):
+    """Пересчитать похожие для устаревших произведений (или для всех).
+
+    Флаг similar_stale снимается только после записи новых строк и не
+    снимается с произведений, изменённых во время расчёта (по журналу
+    изменений): их пересчитает следующий запуск. Возвращает число
+    пересчитанных произведений.
+    """
+    chunk_size = chunk_size or settings.SIMILARITY_CHUNK_SIZE
+    # Курсор с запасом CHANGES_SAFETY_LAG: изменения незавершённых
+    # транзакций тоже оставят флаг до следующего запуска.
+    started = changes.latest_cursor()
+    stale = Title.objects.all()
+    if not full:
+        stale = stale.filter(similar_stale=True)
+    stale_ids = list(stale.values_list('id', flat=True))
+    if not stale_ids:
+        return 0
+    title_ids, masks = np.array(
+        list(Title.objects.order_by('id').values_list('id', 'genre_mask')),
+        dtype=np.int64
+    ).reshape(-1, 2).T
+    reviews = reviews_matrix(title_ids)
+    genres = genres_matrix(masks)
+    genre_sizes = np.asarray(genres.sum(axis=1)).ravel()
+    neighbours = SimilarTitle.objects.filter(
+        similar_id__in=stale_ids
+    ).values_list('title_id', flat=True)
+    targets = np.flatnonzero(
+        np.isin(title_ids, stale_ids) | np.isin(title_ids, list(neighbours))
+    )
+    for start in range(0, len(targets), chunk_size):
+        chunk = targets[start:start + chunk_size]
+        chunk_ids = title_ids[chunk].tolist()
+        entries = top_entries(
+            chunk, chunk_similarities(chunk, reviews, genres, genre_sizes),
+            title_ids, settings.SIMILAR_TITLES_SIZE
+        )
+        with transaction.atomic():
+            SimilarTitle.objects.filter(title_id__in=chunk_ids).delete()
+            SimilarTitle.objects.bulk_create(entries, batch_size=1000)
+            Title.objects.filter(pk__in=chunk_ids).exclude(
+                pk__in=changes.changed_ids(Title, started, MAX_ID)
+            ).update(similar_stale=False)
+    return len(targets)
@@ -564,3 +564,15 @@ class Test01UserAPI:
             f'Проверьте, что PATCH-запрос к `{self.USERS_ME_URL}` с ключом '
             '`role` не изменяет роль пользователя.'
         )
+
+    def test_11_users_multi_get(self, admin_client, user, admin):
+        response = admin_client.get(
+            self.USERS_URL, {'ids': f'{user.username},{admin.username}'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert [row['username'] for row in response.json()] == [
+            user.username, admin.username
+        ], (
+            f'Проверьте, что `{self.USERS_URL}?ids=` возвращает '
+            'пользователей по username в порядке запроса.'
+        )
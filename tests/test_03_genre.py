@@ -2,6 +2,7 @@ from http import HTTPStatus
 
 import pytest
 
+from reviews.models import Genre, free_genre_bit
 from tests.utils import (
     check_name_and_slug_patterns, check_pagination, check_permissions,
     create_genre
@@ -136,3 +137,16 @@ class Test03GenreAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, self.GENRES_URL, data,
                           'модератора', genres, HTTPStatus.FORBIDDEN)
+
+    def test_06_genre_bit_race(self, monkeypatch):
+        first = Genre.objects.create(name='Первый', slug='first')
+        bits = iter([first.bit])
+        monkeypatch.setattr(
+            'reviews.models.free_genre_bit',
+            lambda: next(bits, free_genre_bit())
+        )
+        second = Genre.objects.create(name='Второй', slug='second')
+        assert second.bit is not None and second.bit != first.bit, (
+            'Проверьте, что жанр, которому достался уже занятый бит маски, '
+            'получает другой свободный бит.'
+        )
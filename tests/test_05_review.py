@@ -1,8 +1,15 @@
+import asyncio
+import json
 from http import HTTPStatus
 
 import pytest
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
 from django.db.utils import IntegrityError
 
+from api import signals
+from api.events import with_event_streams
+from api.serializers import ReviewSerializer
 from tests.utils import (
     check_fields, check_pagination, create_reviews, create_single_review,
     create_titles
@@ -413,3 +420,53 @@ class Test05ReviewAPI:
             f'Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_review_events(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+
+        async def application(scope, receive, send):
+            raise AssertionError('Поток событий ушёл в Django.')
+
+        async def stream():
+            communicator = ApplicationCommunicator(
+                with_event_streams(application),
+                {'type': 'http', 'method': 'GET', 'headers': [],
+                 'path': f'/api/v1/titles/{title_id}/events/'}
+            )
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output(5)
+            await communicator.receive_output(5)
+            await sync_to_async(create_single_review)(
+                user_client, title_id, 'Новый отзыв', 7
+            )
+            event = await communicator.receive_output(5)
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(5)
+            return start, event['body'].decode()
+
+        start, body = asyncio.run(stream())
+        assert start['status'] == HTTPStatus.OK
+        event, data = body.strip().split('\n')
+        assert event == 'event: review', (
+            'Проверьте, что поток событий произведения получает событие '
+            'о новом отзыве.'
+        )
+        review = json.loads(data[len('data: '):])
+        assert (review['text'], review['score']) == ('Новый отзыв', 7)
+
+    def test_08_review_events_without_subscribers(self, admin_client,
+                                                  user_client, monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+        serialized = []
+
+        def serializer(instance):
+            serialized.append(instance)
+            return ReviewSerializer(instance)
+
+        monkeypatch.setattr(signals, 'ReviewSerializer', serializer)
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 5)
+        assert not serialized, (
+            'Проверьте, что событие о новом отзыве не сериализуется, '
+            'если поток произведения никто не слушает.'
+        )
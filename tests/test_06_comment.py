@@ -1,3 +1,4 @@
+from base64 import urlsafe_b64encode
 from http import HTTPStatus
 
 import pytest
@@ -366,3 +367,50 @@ class Test06CommentAPI:
             f'Проверьте, что PUT-запрос к `{self.COMMENT_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_08_activity_feed(self, admin_client, admin, user_client, user,
+                              moderator_client, moderator, settings):
+        settings.ACTIVITY_FEED_PAGE_SIZE = 4
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        comments, reviews, _ = create_comments(admin_client, author_map)
+        url = '/api/v1/activity/'
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` недоступна обычному пользователю.'
+        )
+
+        response = moderator_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        first = response.json()
+        assert len(first['results']) == 4 and first['next'], (
+            f'Проверьте, что `{url}` отдаёт страницу фиксированного размера '
+            'и ссылку на следующую.'
+        )
+        second = moderator_client.get(first['next']).json()
+        assert second['next'] is None
+        entries = [
+            (entry['type'], entry['id'])
+            for entry in first['results'] + second['results']
+        ]
+        assert entries == (
+            [('comment', comment['id']) for comment in reversed(comments)]
+            + [('review', review['id']) for review in reversed(reviews)]
+        ), (
+            f'Проверьте, что `{url}` отдаёт отзывы и комментарии вместе, '
+            'от новых к старым, без повторов между страницами.'
+        )
+        assert moderator_client.get(
+            url, {'cursor': 'broken'}
+        ).status_code == HTTPStatus.BAD_REQUEST
+        cursor = urlsafe_b64encode(
+            f'2020-01-01T00:00:00+00:00|review|{10 ** 20}'.encode()
+        ).decode()
+        assert moderator_client.get(
+            url, {'cursor': cursor}
+        ).status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что курсор `{url}` с id вне диапазона первичного '
+            'ключа возвращает статус 400.'
+        )
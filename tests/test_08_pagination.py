@@ -0,0 +1,38 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08PaginationAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_count_cache_invalidation(self, admin_client, client):
+        titles, categories, genres = create_titles(admin_client)
+        response = client.get(self.TITLES_URL)
+        assert response.json()['count'] == len(titles)
+
+        admin_client.delete(f'{self.TITLES_URL}{titles[0]["id"]}/')
+        response = client.get(self.TITLES_URL)
+        assert response.json()['count'] == len(titles) - 1, (
+            'Проверьте, что после удаления произведения ключ `count` '
+            f'в ответе на GET-запрос к `{self.TITLES_URL}` обновляется.'
+        )
+
+    def test_02_count_opt_out(self, admin_client, client):
+        create_titles(admin_client)
+        response = client.get(self.TITLES_URL, {'count': 'false'})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}?count=false` '
+            'возвращает ответ без ключа `count`.'
+        )
+        assert len(data['results']) == 2
+        assert data['next'] is None
+
+        response = client.get(self.TITLES_URL, {'count': 'false', 'page': 5})
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,75 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.throttling import reset_bucket_stores
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09ThrottlingAPI:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    URL_TOKEN = '/api/v1/auth/token/'
+
+    def test_01_signup_identity_throttled(self, client, django_user_model):
+        data = {'email': 'throttled@yamdb.fake', 'username': 'throttled'}
+        for _ in range(5):
+            response = client.post(self.URL_SIGNUP, data=data)
+            assert response.status_code == HTTPStatus.OK
+        response = client.post(self.URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что частые POST-запросы к `{self.URL_SIGNUP}` '
+            'с одним и тем же `username` ограничиваются статусом 429.'
+        )
+        assert 'Retry-After' in response
+
+    def test_02_token_username_throttled(self, client, user):
+        data = {'username': user.username, 'confirmation_code': '12345'}
+        for _ in range(5):
+            response = client.post(self.URL_TOKEN, data=data)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.post(self.URL_TOKEN, data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что подбор кода подтверждения через `{self.URL_TOKEN}` '
+            'ограничивается статусом 429.'
+        )
+
+    def test_03_non_object_body(self, client):
+        for url in (self.URL_SIGNUP, self.URL_TOKEN):
+            response = client.post(
+                url, data='["username"]', content_type='application/json'
+            )
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что JSON-массив в теле запроса к `{url}` '
+                'возвращает статус 400, а не ошибку сервера.'
+            )
+
+    def test_04_cache_bucket_store(self, client, settings):
+        settings.THROTTLE_BUCKET_STORE = 'api.throttling.CacheBucketStore'
+        reset_bucket_stores()
+        data = {'email': 'cached@yamdb.fake', 'username': 'cached'}
+        statuses = [
+            client.post(self.URL_SIGNUP, data=data).status_code
+            for _ in range(6)
+        ]
+        assert statuses == [HTTPStatus.OK] * 5 + [
+            HTTPStatus.TOO_MANY_REQUESTS
+        ], (
+            'Проверьте, что корзины токенов в кэше ограничивают частые '
+            'запросы так же, как корзины в памяти процесса.'
+        )
+
+    def test_05_forwarded_for_ignored(self, client):
+        statuses = [
+            client.post(
+                self.URL_TOKEN,
+                data={'username': f'user{i}', 'confirmation_code': '1'},
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{i}'
+            ).status_code
+            for i in range(21)
+        ]
+        assert HTTPStatus.TOO_MANY_REQUESTS not in statuses[:20]
+        assert statuses[20] == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что смена заголовка X-Forwarded-For не обходит '
+            f'лимит запросов к `{self.URL_TOKEN}` по IP.'
+        )
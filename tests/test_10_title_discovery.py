@@ -0,0 +1,783 @@
+import threading
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from api import batch
+from api.catalog import catalog
+from reviews.changes import record_titles
+from reviews.models import Review, Title, TitleActivityBucket
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10TitleDiscoveryAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+    TOP_URL = '/api/v1/titles/top/'
+
+    def test_01_top_titles(self, admin_client, user_client, moderator_client):
+        titles, categories, genres = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'текст', 2)
+        create_single_review(moderator_client, titles[0]['id'], 'текст', 3)
+        create_single_review(user_client, titles[1]['id'], 'текст', 10)
+
+        response = admin_client.get(self.TOP_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{self.TOP_URL}` не найден или недоступен.'
+        )
+        data = response.json()
+        assert [title['id'] for title in data] == [
+            titles[1]['id'], titles[0]['id']
+        ], (
+            f'Проверьте, что `{self.TOP_URL}` упорядочивает произведения '
+            'по взвешенному рейтингу.'
+        )
+        assert data[0]['weighted_rating'] > data[1]['weighted_rating']
+
+        response = admin_client.get(
+            self.TOP_URL, {'genre': genres[0]['slug']}
+        )
+        assert [title['id'] for title in response.json()] == [
+            titles[0]['id']
+        ], (
+            f'Проверьте, что `{self.TOP_URL}?genre=<slug>` возвращает только '
+            'произведения этого жанра.'
+        )
+
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[1]["id"]}/',
+            data={'genre': [genres[0]['slug']]}
+        )
+        response = admin_client.get(
+            self.TOP_URL, {'genre': genres[0]['slug'], 'limit': 1}
+        )
+        assert [title['id'] for title in response.json()] == [
+            titles[1]['id']
+        ], (
+            'Проверьте, что рейтинг жанра обновляется при изменении жанров '
+            'произведения.'
+        )
+
+        category = titles[1]['category']
+        admin_client.get(self.TOP_URL)
+        admin_client.delete(f'/api/v1/categories/{category}/')
+        response = admin_client.get(self.TOP_URL)
+        assert response.json()[0]['category'] is None, (
+            'Проверьте, что удаление категории сбрасывает закэшированный '
+            'рейтинг всех разделов.'
+        )
+
+    def test_02_ordering(self, admin_client, user_client, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'текст', 4)
+        create_single_review(user_client, titles[1]['id'], 'текст', 8)
+        create_single_review(moderator_client, titles[1]['id'], 'текст', 6)
+
+        for ordering, expected in (
+            ('-rating', [titles[1]['id'], titles[0]['id']]),
+            ('rating', [titles[0]['id'], titles[1]['id']]),
+            ('-reviews_count', [titles[1]['id'], titles[0]['id']]),
+            ('-year', [titles[1]['id'], titles[0]['id']]),
+        ):
+            response = admin_client.get(
+                self.TITLES_URL, {'ordering': ordering}
+            )
+            assert response.status_code == HTTPStatus.OK
+            results = response.json()['results']
+            assert [title['id'] for title in results] == expected, (
+                f'Проверьте, что `{self.TITLES_URL}?ordering={ordering}` '
+                'сортирует произведения.'
+            )
+        assert results[0]['rating'] == 7
+
+        create_single_review(moderator_client, titles[0]['id'], 'текст', 10)
+        results = admin_client.get(
+            self.TITLES_URL, {'ordering': '-rating'}
+        ).json()['results']
+        assert [title['id'] for title in results] == sorted(
+            title['id'] for title in titles[:2]
+        ), (
+            'Проверьте, что при равном рейтинге произведения упорядочены '
+            'по id.'
+        )
+
+    def test_03_range_filters(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'текст', 9)
+        create_single_review(user_client, titles[1]['id'], 'текст', 5)
+
+        for params, expected in (
+            ({'year_min': 1985}, [titles[1]['id']]),
+            ({'year_max': 1985}, [titles[0]['id']]),
+            ({'rating_min': 8}, [titles[0]['id']]),
+            ({'rating_max': 8, 'year_min': 1980}, [titles[1]['id']]),
+            ({'name_prefix': 'терм'}, [titles[0]['id']]),
+            ({'name_contains': 'орешек'}, [titles[1]['id']]),
+        ):
+            response = admin_client.get(self.TITLES_URL, params)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert [title['id'] for title in data['results']] == expected, (
+                f'Проверьте фильтрацию `{self.TITLES_URL}` по параметрам '
+                f'{params}.'
+            )
+            assert data['count'] == len(expected)
+
+    def test_04_genre_modes(self, admin_client):
+        titles, _, genres = create_titles(admin_client)
+        horror, comedy, drama = (genre['slug'] for genre in genres)
+
+        for params, expected in (
+            ({'genre': [horror, comedy]}, [titles[0]['id']]),
+            ({'genre': [horror, drama]}, [titles[1]['id'], titles[0]['id']]),
+            ({'genre': [horror, comedy], 'genre_mode': 'all'},
+             [titles[0]['id']]),
+            ({'genre': [horror, drama], 'genre_mode': 'all'}, []),
+        ):
+            response = admin_client.get(self.TITLES_URL, params)
+            assert response.status_code == HTTPStatus.OK
+            results = response.json()['results']
+            assert [title['id'] for title in results] == expected, (
+                f'Проверьте фильтрацию `{self.TITLES_URL}` по жанрам '
+                f'с параметрами {params}.'
+            )
+
+        admin_client.delete(f'/api/v1/genres/{comedy}/')
+        response = admin_client.get(
+            self.TITLES_URL, {'genre': [horror], 'genre_mode': 'all'}
+        )
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']
+        ]
+
+    def test_05_catalog_index(self, admin_client, user_client, settings):
+        titles, _, genres = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'текст', 9)
+        queries = (
+            {},
+            {'ordering': '-rating'},
+            {'year_min': 1985},
+            {'rating_min': 8},
+            {'name_prefix': 'терм'},
+            {'genre': [genres[0]['slug'], genres[2]['slug']]},
+            {'genre': [genres[0]['slug'], genres[1]['slug']],
+             'genre_mode': 'all'},
+            {'category': [titles[1]['category']]},
+        )
+        expected = [admin_client.get(self.TITLES_URL, params).json()
+                    for params in queries]
+
+        settings.CATALOG_INDEX_ENABLED = True
+        settings.CHANGES_SAFETY_LAG = 0
+        settings.CATALOG_INDEX_SYNC_INTERVAL = 0
+        response = admin_client.get(self.TITLES_URL, queries[0])
+        assert response.json() == expected[0], (
+            'Проверьте, что до построения индекса каталога список '
+            'произведений отвечает через ORM.'
+        )
+        catalog.start_build().join()
+        for params, data in zip(queries, expected):
+            response = admin_client.get(self.TITLES_URL, params)
+            assert response.status_code == HTTPStatus.OK
+            assert response.json() == data, (
+                'Проверьте, что индекс каталога отвечает так же, как запрос '
+                f'к базе данных, для параметров {params}.'
+            )
+
+        create_single_review(user_client, titles[1]['id'], 'текст', 10)
+        response = admin_client.get(self.TITLES_URL, {'ordering': '-rating'})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[1]['id'], titles[0]['id']
+        ], 'Проверьте, что индекс каталога обновляется после записи отзыва.'
+
+        # Запись другого процесса видна индексу только через журнал.
+        title = Title.objects.filter(pk=titles[0]['id'])
+        title.update(year=1900)
+        params = {'year_max': 1950}
+        assert admin_client.get(self.TITLES_URL, params).json()['count'] == 0
+        record_titles(title)
+        response = admin_client.get(self.TITLES_URL, params)
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']
+        ], (
+            'Проверьте, что индекс каталога догоняет журнал изменений, '
+            'не перестраиваясь целиком.'
+        )
+
+    def test_06_autocomplete(self, admin_client, user_client):
+        url = f'{self.TITLES_URL}autocomplete/'
+        titles, categories, genres = create_titles(admin_client)
+        data = {
+            'name': 'Крёстный отец',
+            'year': 1972,
+            'genre': [genres[2]['slug']],
+            'category': categories[0]['slug'],
+        }
+        godfather = admin_client.post(self.TITLES_URL, data=data).json()
+        create_single_review(user_client, godfather['id'], 'текст', 10)
+        create_single_review(user_client, titles[1]['id'], 'текст', 7)
+
+        response = admin_client.get(url, {'q': 'кР'})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{url}` не найден или недоступен.'
+        )
+        assert response.json() == [
+            {'id': godfather['id'], 'name': 'Крёстный отец', 'year': 1972,
+             'rating': 10},
+            {'id': titles[1]['id'], 'name': 'Крепкий орешек', 'year': 1988,
+             'rating': 7},
+        ], (
+            f'Проверьте, что `{url}?q=` возвращает произведения с названием, '
+            'начинающимся с q без учёта регистра, в порядке рейтинга.'
+        )
+        response = admin_client.get(url, {'q': 'крест', 'limit': 1})
+        assert [title['id'] for title in response.json()] == [
+            godfather['id']
+        ], 'Проверьте, что в подсказках ё и е не различаются.'
+
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[0]["id"]}/', data={'name': 'Крик'}
+        )
+        response = admin_client.get(url, {'q': 'кри'})
+        assert [title['id'] for title in response.json()] == [
+            titles[0]['id']
+        ], 'Проверьте, что подсказки обновляются при изменении названия.'
+        assert admin_client.get(url).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_07_fuzzy_search(self, admin_client, settings, tmp_path,
+                             monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+
+        for query, expected in (
+            ('терменатор', [titles[0]['id']]),
+            ('terminator', [titles[0]['id']]),
+            ('krepkiy oreshek', [titles[1]['id']]),
+            ('абвгд', []),
+        ):
+            response = admin_client.get(self.TITLES_URL, {'fuzzy': query})
+            assert response.status_code == HTTPStatus.OK
+            assert [title['id'] for title in response.json()['results']] == (
+                expected
+            ), (
+                f'Проверьте, что `{self.TITLES_URL}?fuzzy={query}` находит '
+                'похожие названия с учётом опечаток и транслитерации.'
+            )
+
+        # Отставший индекс отвечает сразу, а новый строится в фоне.
+        settings.CHANGES_SAFETY_LAG = 0
+        settings.CATALOG_INDEX_SYNC_INTERVAL = 0
+        settings.CATALOG_INDEX_SYNC_LIMIT = 0
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[0]["id"]}/',
+            data={'name': 'Терминатор 2'}
+        )
+        started = []
+        monkeypatch.setattr(catalog, 'start_build', lambda: started.append(
+            threading.Thread()
+        ) or started[-1])
+        response = admin_client.get(self.TITLES_URL, {'fuzzy': 'терменатор'})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']
+        ] and started, (
+            'Проверьте, что нечёткий поиск отвечает из прежнего индекса, '
+            'пока новый строится в фоне.'
+        )
+        monkeypatch.undo()
+        settings.CATALOG_INDEX_SYNC_LIMIT = 1000
+
+        settings.FUZZY_INDEX_PATH = str(tmp_path / 'trigrams.npz')
+        call_command('build_fuzzy_index')
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[1]["id"]}/', data={'name': 'Терминал'}
+        )
+        # Новый процесс строит каталог вместе с триграммами из снимка.
+        catalog.build()
+        response = admin_client.get(self.TITLES_URL, {'fuzzy': 'терминал'})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[1]['id'], titles[0]['id']
+        ], (
+            'Проверьте, что индекс из снимка учитывает изменения названий '
+            'после его сохранения.'
+        )
+
+    def test_08_similar_titles(self, admin_client, user_client,
+                               moderator_client, monkeypatch, settings):
+        settings.CHANGES_SAFETY_LAG = 0
+        titles, categories, genres = create_titles(admin_client)
+        alien = admin_client.post(self.TITLES_URL, data={
+            'name': 'Чужой',
+            'year': 1979,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        }).json()
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/similar/'
+
+        call_command('build_similarity')
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{url}` не найден или недоступен.'
+        )
+        data = response.json()
+        assert [title['id'] for title in data] == [alien['id']], (
+            'Проверьте, что похожими считаются произведения с общими '
+            'жанрами.'
+        )
+        assert data[0]['similarity'] > 0
+
+        for client, scores in ((user_client, (10, 10, 1)),
+                               (moderator_client, (9, 9, 2))):
+            for title_id, score in zip(
+                    (titles[0]['id'], titles[1]['id'], alien['id']), scores):
+                create_single_review(client, title_id, 'текст', score)
+        call_command('build_similarity')
+        assert [title['id'] for title in admin_client.get(url).json()] == [
+            titles[1]['id']
+        ], (
+            'Проверьте, что похожесть учитывает совпадение оценок и '
+            'пересчитывается для произведений с новыми отзывами.'
+        )
+
+        before = admin_client.get(url).json()[0]['similarity']
+        admin_client.patch(f'{self.TITLES_URL}{titles[1]["id"]}/', data={
+            'genre': [genres[0]['slug']]
+        })
+
+        def broken_top_entries(*args, **kwargs):
+            raise RuntimeError
+
+        monkeypatch.setattr(
+            'reviews.similarity.top_entries', broken_top_entries
+        )
+        with pytest.raises(RuntimeError):
+            call_command('build_similarity')
+        assert Title.objects.get(pk=titles[1]['id']).similar_stale, (
+            'Проверьте, что прерванный `build_similarity` не снимает флаг '
+            '`similar_stale`.'
+        )
+        monkeypatch.undo()
+        call_command('build_similarity')
+        assert admin_client.get(url).json()[0]['similarity'] > before, (
+            'Проверьте, что `build_similarity` пересчитывает и '
+            'произведения, у которых устаревшее было среди похожих.'
+        )
+
+    def test_09_recommendations(self, client, admin_client, user_client,
+                                moderator_client):
+        url = '/api/v1/users/me/recommendations/'
+        titles, categories, genres = create_titles(admin_client)
+        alien = admin_client.post(self.TITLES_URL, data={
+            'name': 'Чужой',
+            'year': 1979,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        }).json()
+        for title_id, score in ((titles[0]['id'], 10), (titles[1]['id'], 10),
+                                (alien['id'], 2)):
+            create_single_review(moderator_client, title_id, 'текст', score)
+        call_command('build_similarity')
+        create_single_review(user_client, titles[0]['id'], 'текст', 9)
+
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{url}` не найден или недоступен.'
+        )
+        data = response.json()
+        assert [title['id'] for title in data] == [titles[1]['id']], (
+            f'Проверьте, что `{url}` рекомендует непрочитанные произведения, '
+            'похожие на оценённые пользователем высоко.'
+        )
+        assert data[0]['predicted_rating'] == 9
+
+        create_single_review(user_client, titles[1]['id'], 'текст', 8)
+        assert [title['id'] for title in user_client.get(url).json()] == [
+            alien['id']
+        ], (
+            'Проверьте, что рекомендации пересчитываются после нового '
+            'отзыва пользователя и не содержат оценённых им произведений.'
+        )
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_10_trending(self, admin_client, user_client, moderator_client):
+        url = f'{self.TITLES_URL}trending/'
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'текст', 3)
+        create_single_review(user_client, titles[1]['id'], 'текст', 8)
+        create_single_review(moderator_client, titles[1]['id'], 'текст', 6)
+
+        response = admin_client.get(url, {'window': '7d'})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{url}` не найден или недоступен.'
+        )
+        data = response.json()
+        assert [title['id'] for title in data] == [
+            titles[1]['id'], titles[0]['id']
+        ], (
+            f'Проверьте, что `{url}` упорядочивает произведения по числу '
+            'и оценкам недавних отзывов.'
+        )
+        assert [title['recent_reviews'] for title in data] == [2, 1]
+        assert admin_client.get(
+            url, {'window': '1y'}
+        ).status_code == HTTPStatus.BAD_REQUEST
+
+        TitleActivityBucket.objects.update(
+            start=timezone.now() - timedelta(days=3)
+        )
+        call_command('compact_activity')
+        assert TitleActivityBucket.objects.count() == 2
+        cache.clear()
+        assert admin_client.get(url).json() == [], (
+            'Проверьте, что в окно 24h не попадают старые отзывы.'
+        )
+        assert len(admin_client.get(url, {'window': '30d'}).json()) == 2
+
+    def test_11_rating_history(self, admin_client, user_client,
+                               moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/rating-history/'
+        create_single_review(user_client, titles[0]['id'], 'текст', 4)
+        review = create_single_review(
+            moderator_client, titles[0]['id'], 'текст', 8
+        ).json()
+
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{url}` не найден или недоступен.'
+        )
+        today = timezone.localdate()
+        assert response.json() == [{
+            'day': str(today), 'reviews_count': 2, 'average': 6, 'rating': 6
+        }], (
+            f'Проверьте, что `{url}` возвращает число и среднюю оценку '
+            'отзывов за каждый день.'
+        )
+
+        Review.objects.exclude(pk=review['id']).update(
+            pub_date=timezone.now() - timedelta(days=2)
+        )
+        call_command('backfill_rating_history')
+        data = admin_client.get(url).json()
+        assert [
+            (row['day'], row['average'], row['rating']) for row in data
+        ] == [(str(today - timedelta(days=2)), 4, 4), (str(today), 8, 6)], (
+            'Проверьте, что история показывает среднюю оценку на конец '
+            'каждого дня.'
+        )
+        response = admin_client.get(url, {'since': str(today)})
+        assert [row['rating'] for row in response.json()] == [6]
+        assert admin_client.get(
+            url, {'since': 'вчера'}
+        ).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_12_analytics(self, admin_client, user_client, moderator_client):
+        url = '/api/v1/analytics/genres/'
+        titles, categories, genres = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'текст', 4)
+        create_single_review(moderator_client, titles[0]['id'], 'текст', 8)
+        create_single_review(user_client, titles[1]['id'], 'текст', 10)
+
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` доступен только администратору.'
+        )
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{url}` не найден или недоступен.'
+        )
+        stats = {row['slug']: row for row in response.json()['results']}
+        expected = {
+            genres[0]['slug']: (1, 2, 6),
+            genres[1]['slug']: (1, 2, 6),
+            genres[2]['slug']: (1, 1, 10),
+        }
+        assert {
+            slug: (row['titles_count'], row['reviews_count'],
+                   row['average_score'])
+            for slug, row in stats.items()
+        } == expected, (
+            f'Проверьте, что `{url}` возвращает число произведений, '
+            'отзывов и среднюю оценку для каждого жанра.'
+        )
+
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[1]["id"]}/',
+            data={'genre': [genres[0]['slug']],
+                  'category': categories[0]['slug']}
+        )
+        admin_client.delete(f'{self.TITLES_URL}{titles[0]["id"]}/')
+        incremental = (
+            admin_client.get(url).json(),
+            admin_client.get('/api/v1/analytics/categories/').json()
+        )
+        call_command('rebuild_stats')
+        assert incremental == (
+            admin_client.get(url).json(),
+            admin_client.get('/api/v1/analytics/categories/').json()
+        ), (
+            'Проверьте, что статистика жанров и категорий обновляется при '
+            'изменении и удалении произведений.'
+        )
+        stats = {row['slug']: row for row in incremental[1]['results']}
+        assert stats[categories[0]['slug']]['reviews_count'] == 1
+
+    def test_13_facets(self, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        horror, comedy, drama = (genre['slug'] for genre in genres)
+
+        response = admin_client.get(
+            self.TITLES_URL, {'facets': 'genre,category,year'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'facets' in data, (
+            f'Проверьте, что `{self.TITLES_URL}?facets=` добавляет в ответ '
+            'ключ `facets`.'
+        )
+        assert {row['slug']: row['count']
+                for row in data['facets']['genre']} == {
+            horror: 1, comedy: 1, drama: 1
+        }
+        assert [row['count'] for row in data['facets']['category']] == [1, 1]
+        assert data['facets']['year'] == [{'decade': 1980, 'count': 2}]
+
+        response = admin_client.get(
+            self.TITLES_URL, {'facets': 'genre', 'genre': [drama]}
+        )
+        assert response.json()['facets'] == {'genre': [
+            {'slug': drama, 'name': genres[2]['name'], 'count': 1}
+        ]}, (
+            'Проверьте, что фасеты считаются с учётом фильтров запроса.'
+        )
+        assert admin_client.get(
+            self.TITLES_URL, {'facets': 'author'}
+        ).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_14_include_reviews(self, admin_client, user_client,
+                                moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'первый', 4)
+        create_single_review(moderator_client, titles[0]['id'], 'второй', 8)
+        create_single_review(user_client, titles[1]['id'], 'третий', 6)
+
+        response = admin_client.get(
+            self.TITLES_URL, {'include': 'reviews', 'reviews_limit': 1}
+        )
+        assert response.status_code == HTTPStatus.OK
+        included = {
+            title['id']: title['latest_reviews']
+            for title in response.json()['results']
+        }
+        assert [review['text'] for review in included[titles[0]['id']]] == [
+            'второй'
+        ], (
+            f'Проверьте, что `{self.TITLES_URL}?include=reviews` добавляет '
+            'к произведению его новые отзывы, не больше `reviews_limit`.'
+        )
+        assert included[titles[1]['id']][0]['author'] == 'TestUser'
+        assert 'latest_reviews' not in admin_client.get(
+            self.TITLES_URL
+        ).json()['results'][0]
+        for params in ({'include': 'comments'},
+                       {'include': 'reviews', 'reviews_limit': 0}):
+            assert admin_client.get(
+                self.TITLES_URL, params
+            ).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_15_change_feed(self, admin_client, user_client, settings):
+        url = '/api/v1/changes/'
+        start = admin_client.get(url).json()
+        assert start['results'] == [], (
+            f'Проверьте, что `{url}` без `since` возвращает только текущий '
+            'курсор.'
+        )
+        titles, _, _ = create_titles(admin_client)
+        review_id = create_single_review(
+            user_client, titles[0]['id'], 'текст', 5
+        ).json()['id']
+        admin_client.delete(f'{self.TITLES_URL}{titles[1]["id"]}/')
+        assert admin_client.get(url, {'since': start['cursor']}).json() == {
+            'cursor': start['cursor'], 'has_more': False, 'results': []
+        }, (
+            f'Проверьте, что `{url}?since=` не отдаёт записи моложе '
+            '`CHANGES_SAFETY_LAG`: раньше них ещё могут закоммититься '
+            'записи с меньшим курсором.'
+        )
+
+        settings.CHANGES_SAFETY_LAG = 0
+        response = admin_client.get(url, {'since': start['cursor']})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        changes = [
+            (entry['model'], entry['id'], entry['action'])
+            for entry in data['results']
+        ]
+        assert ('review', review_id, 'created') in changes
+        assert changes[-1] == ('title', titles[1]['id'], 'deleted'), (
+            f'Проверьте, что `{url}?since=` отдаёт изменения в порядке '
+            'курсора.'
+        )
+        assert data['cursor'] == data['results'][-1]['cursor']
+        assert admin_client.get(
+            url, {'since': data['cursor']}
+        ).json()['results'] == []
+
+        for since in (-1, 10 ** 20):
+            assert admin_client.get(
+                url, {'since': since}
+            ).status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что `{url}?since=` вне диапазона курсоров '
+                'возвращает статус 400.'
+            )
+
+        call_command('compact_changes')
+        compacted = admin_client.get(url, {'since': start['cursor']}).json()
+        assert len(compacted['results']) == len(set(
+            (model, object_id) for model, object_id, _ in changes
+        )), (
+            'Проверьте, что `compact_changes` оставляет по одной записи на '
+            'объект.'
+        )
+
+    def test_16_batch(self, admin_client, user_client, settings,
+                      monkeypatch, caplog):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = '/api/v1/batch/'
+        requests = [
+            {'method': 'GET', 'url': f'{self.TITLES_URL}{title_id}/'},
+            {'method': 'POST', 'url': f'{self.TITLES_URL}{title_id}/reviews/',
+             'body': {'text': 'Отзыв из пакета', 'score': 6}},
+            {'method': 'GET', 'url': '/api/v1/users/me/'},
+            {'method': 'GET', 'url': '/api/v1/unknown/'},
+        ]
+        response = user_client.post(
+            url, {'requests': requests}, format='json'
+        )
+        assert response.status_code == HTTPStatus.OK
+        responses = response.json()['responses']
+        assert [item['status'] for item in responses] == [
+            HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.OK,
+            HTTPStatus.NOT_FOUND
+        ], (
+            f'Проверьте, что `{url}` выполняет подзапросы от имени '
+            'пользователя и возвращает их ответы по порядку.'
+        )
+        assert responses[0]['body']['name'] == titles[0]['name']
+        assert responses[1]['body']['author'] == responses[2]['body'][
+            'username'
+        ]
+
+        response = user_client.post(url, {'parallel': True, 'requests': [
+            {'method': 'GET', 'url': f'{self.TITLES_URL}{title_id}/reviews/'},
+            {'method': 'GET', 'url': f'{self.TITLES_URL}?year=1000'},
+        ]}, format='json')
+        counts = [item['body']['count'] for item in response.json()[
+            'responses'
+        ]]
+        assert counts == [1, 0]
+
+        def broken_view(request, *args, **kwargs):
+            raise RuntimeError
+
+        resolve_view = batch.resolve_view
+        monkeypatch.setattr(batch, 'resolve_view', lambda path: (
+            (broken_view, (), {}) if path == '/api/v1/broken/'
+            else resolve_view(path)
+        ))
+        for parallel in (False, True):
+            caplog.clear()
+            response = user_client.post(url, {
+                'parallel': parallel, 'requests': [
+                    {'method': 'GET', 'url': '/api/v1/broken/'},
+                    {'method': 'GET', 'url': f'{self.TITLES_URL}{title_id}/'},
+                ]
+            }, format='json')
+            assert response.status_code == HTTPStatus.OK
+            assert [item['status'] for item in response.json()[
+                'responses'
+            ]] == [HTTPStatus.INTERNAL_SERVER_ERROR, HTTPStatus.OK], (
+                f'Проверьте, что ошибка подзапроса в `{url}` (parallel='
+                f'{parallel}) возвращается его ответом со статусом 500, '
+                'а остальные подзапросы выполняются.'
+            )
+            assert '/api/v1/broken/' in caplog.text, (
+                'Проверьте, что ошибка подзапроса пишется в лог.'
+            )
+
+        settings.BATCH_MAX_REQUESTS = 1
+        for requests in (requests, [{'method': 'GET', 'url': url}]):
+            assert user_client.post(
+                url, {'requests': requests}, format='json'
+            ).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_17_multi_get(self, admin_client, user_client, user, settings):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        response = admin_client.get(
+            self.TITLES_URL, {'ids': f'{second},0,{first}'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert [title['id'] for title in response.json()] == [
+            second, first
+        ], (
+            f'Проверьте, что `{self.TITLES_URL}?ids=` возвращает '
+            'произведения в порядке запроса и пропускает несуществующие.'
+        )
+
+        review_id = create_single_review(
+            user_client, first, 'текст', 5
+        ).json()['id']
+        response = admin_client.get(
+            f'{self.TITLES_URL}{first}/reviews/', {'ids': str(review_id)}
+        )
+        assert [review['author'] for review in response.json()] == [
+            user.username
+        ]
+
+        settings.MULTI_GET_MAX_IDS = 1
+        for ids in (f'{first},{second}', 'abc', '', str(10 ** 20)):
+            assert admin_client.get(
+                self.TITLES_URL, {'ids': ids}
+            ).status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что `{self.TITLES_URL}?ids={ids}` возвращает '
+                'статус 400.'
+            )
+
+    def test_18_change_feed_consistency(self, admin_client, user_client,
+                                        settings, monkeypatch):
+        url = '/api/v1/changes/'
+        settings.CHANGES_SAFETY_LAG = 0
+        titles, categories, genres = create_titles(admin_client)
+        cursor = admin_client.get(url).json()['cursor']
+        create_single_review(user_client, titles[0]['id'], 'текст', 5)
+        changes = [
+            (entry['model'], entry['id'], entry['action'])
+            for entry in admin_client.get(
+                url, {'since': cursor}
+            ).json()['results']
+        ]
+        assert ('title', titles[0]['id'], 'updated') in changes, (
+            f'Проверьте, что `{url}` отмечает изменение рейтинга '
+            'произведения после записи отзыва.'
+        )
+
+        def broken_record(*args, **kwargs):
+            raise RuntimeError
+
+        monkeypatch.setattr('reviews.changes.record', broken_record)
+        data = {
+            'name': 'Без журнала',
+            'year': 2000,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        }
+        with pytest.raises(RuntimeError):
+            admin_client.post(self.TITLES_URL, data=data)
+        assert not Title.objects.filter(name=data['name']).exists(), (
+            'Проверьте, что произведение и запись журнала изменений '
+            'сохраняются в одной транзакции.'
+        )
@@ -0,0 +1,70 @@
+import gzip
+
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from api.middleware import ENCODINGS, CompressionMiddleware, choose_encoding
+from tests.utils import create_titles
+
+
+def process(accept_encoding, response):
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11CompressionAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_negotiation(self):
+        assert choose_encoding('gzip, deflate') == 'gzip'
+        assert choose_encoding('*') == next(iter(ENCODINGS))
+        assert choose_encoding('gzip;q=0, identity') is None, (
+            'Проверьте, что кодировка с `q=0` не выбирается.'
+        )
+        assert choose_encoding('') is None
+        assert choose_encoding('gzip;q=0, *') != 'gzip', (
+            'Проверьте, что `*` не разрешает кодировку, отвергнутую `q=0`.'
+        )
+
+    def test_02_min_size(self, client, admin_client, settings):
+        create_titles(admin_client)
+        settings.COMPRESSION_MIN_SIZE = 1
+        response = client.get(self.TITLES_URL, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что ответы не короче `COMPRESSION_MIN_SIZE` '
+            'сжимаются кодировкой из Accept-Encoding.'
+        )
+        assert 'Accept-Encoding' in response['Vary']
+        assert gzip.decompress(response.content).startswith(b'{')
+
+        settings.COMPRESSION_MIN_SIZE = 10 ** 6
+        response = client.get(self.TITLES_URL, HTTP_ACCEPT_ENCODING='gzip')
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что короткие ответы не сжимаются.'
+        )
+
+    def test_03_weak_etag(self):
+        content = b'a' * 1000
+        response = HttpResponse(content)
+        response['ETag'] = '"abc"'
+        response = process('gzip', response)
+        assert response['ETag'] == 'W/"abc"', (
+            'Проверьте, что сжатый ответ получает слабый ETag.'
+        )
+        assert gzip.decompress(response.content) == content
+
+    def test_04_streaming(self):
+        chunks = [b'a' * 100, b'b' * 100]
+        response = StreamingHttpResponse(iter(chunks))
+        response['Content-Length'] = '200'
+        response = process('gzip', response)
+        assert response['Content-Encoding'] == 'gzip'
+        assert not response.has_header('Content-Length'), (
+            'Проверьте, что у потокового сжатого ответа нет Content-Length.'
+        )
+        assert gzip.decompress(
+            b''.join(response.streaming_content)
+        ) == b''.join(chunks)
@@ -0,0 +1,48 @@
+import importlib
+import io
+import json
+import sys
+
+import pytest
+from rest_framework.exceptions import ParseError
+
+from api import renderers
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def json_backend(request, monkeypatch):
+    """Модуль рендереров с orjson и без него (как если бы он не стоял)."""
+    if request.param == 'json':
+        monkeypatch.setitem(sys.modules, 'orjson', None)
+        importlib.reload(renderers)
+        assert renderers.orjson is None
+    yield request.param
+    monkeypatch.undo()
+    importlib.reload(renderers)
+
+
+class Test12RenderersAPI:
+
+    def test_01_cyrillic_not_escaped(self, json_backend):
+        content = renderers.FastJSONRenderer().render({'name': 'Фильм'})
+        assert 'Фильм'.encode() in content, (
+            'Проверьте, что FastJSONRenderer выводит кириллицу в UTF-8 '
+            'без экранирования.'
+        )
+        assert json.loads(content) == {'name': 'Фильм'}
+
+    def test_02_line_separators(self, json_backend):
+        data = {'text': 'a\u2028b\u2029c'}
+        content = renderers.FastJSONRenderer().render(data)
+        assert b'\\u2028' in content and b'\\u2029' in content, (
+            'Проверьте, что FastJSONRenderer экранирует U+2028 и U+2029.'
+        )
+        assert json.loads(content) == data
+
+    def test_03_parse(self, json_backend):
+        parser = renderers.FastJSONParser()
+        assert parser.parse(
+            io.BytesIO('{"name": "Фильм"}'.encode())
+        ) == {'name': 'Фильм'}
+        with pytest.raises(ParseError):
+            parser.parse(io.BytesIO(b'{"name": '))
@@ -0,0 +1,91 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import path, resolve
+
+from api.views import TitleViewSet
+from tests.utils import create_titles
+
+urlpatterns = []
+
+
+@pytest.fixture
+def catalog(admin_client):
+    """Произведения, созданные через обычные синхронные URL."""
+    return create_titles(admin_client)
+
+
+@pytest.fixture
+def async_urls(settings, catalog):
+    """URL произведений с представлениями, собранными при ASYNC_READS."""
+    settings.ASYNC_READS = True
+    urlpatterns[:] = [
+        path('api/v1/titles/', TitleViewSet.as_view(
+            {'get': 'list', 'post': 'create'}
+        )),
+        path('api/v1/titles/<int:pk>/', TitleViewSet.as_view(
+            {'get': 'retrieve'}
+        )),
+    ]
+    settings.ROOT_URLCONF = __name__
+    yield
+    urlpatterns.clear()
+
+
+@async_to_sync
+async def request(method, url, token=None, **kwargs):
+    """Запрос через ASGI-обработчик AsyncClient."""
+    if token is not None:
+        # В Django 3.2 AsyncClient передаёт extra-аргументы как заголовки.
+        kwargs['authorization'] = f'Bearer {token["access"]}'
+    return await getattr(AsyncClient(), method)(url, **kwargs)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13AsyncReadsAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_list_and_detail(self, catalog, async_urls):
+        titles, _, _ = catalog
+        assert asyncio.iscoroutinefunction(resolve(self.TITLES_URL).func), (
+            'Проверьте, что при ASYNC_READS представления произведений '
+            'асинхронные.'
+        )
+        response = request('get', self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == len(titles), (
+            'Проверьте, что список произведений через асинхронную обёртку '
+            'совпадает с синхронным.'
+        )
+        response = request('get', f'{self.TITLES_URL}{titles[0]["id"]}/')
+        assert response.json()['name'] == titles[0]['name']
+        response = request('get', f'{self.TITLES_URL}{10 ** 9}/')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что асинхронное чтение несуществующего произведения '
+            'возвращает статус 404.'
+        )
+
+    def test_02_permissions(self, token_user, token_admin, catalog,
+                            async_urls):
+        _, categories, genres = catalog
+        data = {
+            'name': 'Асинхронное',
+            'year': 2000,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        }
+        for token, status in ((None, HTTPStatus.UNAUTHORIZED),
+                              (token_user, HTTPStatus.FORBIDDEN),
+                              (token_admin, HTTPStatus.CREATED)):
+            response = request(
+                'post', self.TITLES_URL, token, data=data,
+                content_type='application/json'
+            )
+            assert response.status_code == status, (
+                'Проверьте, что запись через асинхронную обёртку проверяет '
+                'права так же, как синхронное представление.'
+            )